@@ -3,11 +3,13 @@ Admin stuff for Index model
 """
 from django.contrib import admin, messages
 from django.contrib.admin import ModelAdmin
+from django.db import transaction
 from django.forms import Form, FileField, ModelChoiceField
 from django.shortcuts import render, redirect
 from django.urls import path
 
 from fin.models.index import Index
+from fin.tasks.reload_index import reload_index_task
 
 
 class CsvImportForm(Form):
@@ -25,6 +27,13 @@ class IndexAdmin(ModelAdmin):
     """
 
     change_list_template = "import_index_csv.html"
+    readonly_fields = ("reload_status", "reload_timings", "version", "content_hash")
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if obj.source.updatable:
+            # the task must not see the index before the admin transaction commits
+            transaction.on_commit(lambda: reload_index_task.delay(obj.id))
 
     def get_urls(self):
         urls = super().get_urls()
@@ -41,7 +50,7 @@ class IndexAdmin(ModelAdmin):
                 index = form.cleaned_data["index"]
                 csv_file = form.cleaned_data["csv_file"].read().decode("utf-8")
 
-                index.source.parser.csv_file = csv_file
+                index.source.parser.raw_data = csv_file
 
                 parsed_index_tickers = index.source.parser.parse()
                 index.update_from_parsed_index_tickers(parsed_index_tickers)
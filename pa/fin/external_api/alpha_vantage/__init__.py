@@ -1,13 +1,71 @@
 """
 Wrapper for AV API
 """
+import hashlib
 import json
 import os
-import time
+import threading
 from enum import Enum
 from urllib.parse import urlencode, urlunsplit
 
 import requests
+from django.conf import settings
+
+from pa.celery import redis_client
+from .cache import FileResponseCache, RedisResponseCache
+from .limiter import Priorities, RateLimiter, RedisRateLimiter
+
+default_limiter_lock = threading.Lock()
+# pylint: disable=invalid-name
+default_limiter = None
+
+
+def get_default_limiter():
+    """
+    Returns the rate limiter shared by all AV API clients of the process, the Redis limiter
+    shares quotas of the API key with all workers
+    """
+    # pylint: disable=global-statement
+    global default_limiter
+    with default_limiter_lock:
+        if default_limiter is not None:
+            return default_limiter
+
+        if settings.ALPHAVANTAGE_RATE_LIMITER == "redis":
+            apikey = os.environ.get("ALPHAVANTAGE_API_KEY") or ""
+            apikey_hash = hashlib.sha256(apikey.encode()).hexdigest()[:16]
+            default_limiter = RedisRateLimiter(
+                redis_client,
+                f"alpha_vantage:{apikey_hash}",
+                {
+                    "minute": (
+                        settings.ALPHAVANTAGE_CALLS_PER_MINUTE,
+                        RateLimiter.MINUTE,
+                    ),
+                    "day": (settings.ALPHAVANTAGE_CALLS_PER_DAY, RateLimiter.DAY),
+                },
+                settings.ALPHAVANTAGE_INTERACTIVE_RESERVE,
+                settings.ALPHAVANTAGE_INTERACTIVE_WINDOW,
+            )
+        else:
+            default_limiter = RateLimiter(
+                settings.ALPHAVANTAGE_CALLS_PER_MINUTE,
+                settings.ALPHAVANTAGE_CALLS_PER_DAY,
+                settings.ALPHAVANTAGE_INTERACTIVE_RESERVE,
+                settings.ALPHAVANTAGE_INTERACTIVE_WINDOW,
+            )
+        return default_limiter
+
+
+def get_default_cache():
+    """
+    Returns the response cache chosen in the settings or None if caching is disabled
+    """
+    if settings.ALPHAVANTAGE_CACHE == "redis":
+        return RedisResponseCache(redis_client)
+    if settings.ALPHAVANTAGE_CACHE == "file":
+        return FileResponseCache(settings.ALPHAVANTAGE_CACHE_DIR)
+    return None
 
 
 class AVFunctions(Enum):
@@ -28,7 +86,6 @@ class AlphaVantage:
     """
 
     SCHEME = "https"
-    STEP = 60
     NETLOC = "www.alphavantage.co"
     PATH = "/query"
     await_message = (
@@ -38,32 +95,53 @@ class AlphaVantage:
         "API call frequency."
     )
 
-    def __init__(self):
+    DAY = 60 * 60 * 24
+    # Statements change at most quarterly, overview and prices change daily
+    cache_ttls = {
+        AVFunctions.balance_sheet.value: 7 * DAY,
+        AVFunctions.cash_flow.value: 7 * DAY,
+        AVFunctions.income_statement.value: 7 * DAY,
+        AVFunctions.overview.value: DAY,
+        AVFunctions.time_series_monthly_adjusted.value: DAY // 2,
+    }
+
+    def __init__(self, limiter=None, cache=None, priority=Priorities.interactive):
         self.apikey = os.environ.get("ALPHAVANTAGE_API_KEY")
-        self.await_seconds = 0
-        self.step = self.STEP
+        self.limiter = limiter or get_default_limiter()
+        self.cache = cache if cache is not None else get_default_cache()
+        self.priority = priority
 
-    def call(self, function, symbol):
+    def call(self, function, symbol, cancelled=None, bypass_cache=False):
         """
-        Construct URL based on parameters and make a request
+        Returns the cached response or makes a request when the rate limiter allows it, cancelled
+        is an optional threading.Event that interrupts the waiting for the limiter, bypass_cache
+        forces the request and refreshes the cached response
         """
+        if self.cache is not None and not bypass_cache:
+            json_response = self.cache.get(function, symbol)
+            if json_response is not None:
+                return json_response
+
         query = urlencode(dict(function=function, symbol=symbol, apikey=self.apikey))
         url = urlunsplit((self.SCHEME, self.NETLOC, self.PATH, query, ""))
 
-        response = requests.get(url)
-        json_response = json.loads(response.text)
-        while (
-            json_response.get("Note")
-            and json_response.get("Note") == self.await_message
-        ):
-            self.wait()
+        while True:
+            self.limiter.acquire(cancelled, self.priority)
             response = requests.get(url)
             json_response = json.loads(response.text)
+            if json_response.get("Note") != self.await_message:
+                break
+            self.limiter.throttled()
+
+        if self.cache is not None and self.is_cacheable(json_response):
+            self.cache.set(function, symbol, json_response, self.cache_ttls[function])
         return json_response
 
-    def wait(self):
+    @staticmethod
+    def is_cacheable(json_response):
         """
-        Snooze API requests for await_seconds
+        Errors and notes are not cached
         """
-        self.await_seconds += self.step
-        time.sleep(self.await_seconds)
+        return bool(json_response) and not any(
+            key in json_response for key in ["Error Message", "Information", "Note"]
+        )
@@ -0,0 +1,135 @@
+"""
+Caches of the AV API responses
+"""
+import json
+import os
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import Counter
+from urllib.parse import quote
+
+
+class ResponseCache(ABC):
+    """
+    Response cache basic class, responses are stored as the compressed JSON by the function and
+    the symbol, hits and misses are counted
+    """
+
+    def __init__(self):
+        self.counters = Counter()
+
+    @abstractmethod
+    def load(self, function, symbol):
+        """
+        Returns the compressed response or None if it is missing or expired
+        """
+
+    @abstractmethod
+    def store(self, function, symbol, data, ttl):
+        """
+        Stores the compressed response for ttl seconds
+        """
+
+    def record(self, event):
+        """
+        Counts the cache event
+        """
+        self.counters[event] += 1
+
+    def get(self, function, symbol):
+        """
+        Returns the cached response or None
+        """
+        data = self.load(function, symbol)
+        if data is None:
+            self.record("misses")
+            return None
+        self.record("hits")
+        return json.loads(zlib.decompress(data))
+
+    def set(self, function, symbol, response, ttl):
+        """
+        Caches the response
+        """
+        self.store(function, symbol, zlib.compress(json.dumps(response).encode()), ttl)
+
+    def get_metrics(self):
+        """
+        Returns numbers of hits and misses
+        """
+        return {"hits": self.counters["hits"], "misses": self.counters["misses"]}
+
+
+class RedisResponseCache(ResponseCache):
+    """
+    Response cache shared by all workers through Redis, counters are shared as well
+    """
+
+    def __init__(self, redis_client, prefix="alpha_vantage:cache"):
+        super().__init__()
+        self.redis_client = redis_client
+        self.prefix = prefix
+        self.metrics_key = f"{prefix}:metrics"
+
+    def get_key(self, function, symbol):
+        """
+        Returns the Redis key of the response
+        """
+        return f"{self.prefix}:{function}:{symbol}"
+
+    def load(self, function, symbol):
+        return self.redis_client.get(self.get_key(function, symbol))
+
+    def store(self, function, symbol, data, ttl):
+        self.redis_client.set(self.get_key(function, symbol), data, ex=ttl)
+
+    def record(self, event):
+        super().record(event)
+        self.redis_client.hincrby(self.metrics_key, event, 1)
+
+    def get_metrics(self):
+        metrics = self.redis_client.hgetall(self.metrics_key)
+        return {
+            "hits": int(metrics.get(b"hits", 0)),
+            "misses": int(metrics.get(b"misses", 0)),
+        }
+
+
+class FileResponseCache(ResponseCache):
+    """
+    Response cache in the local directory, expiration time is kept in the file modification time
+    """
+
+    def __init__(self, directory):
+        super().__init__()
+        self.directory = directory
+
+    def get_path(self, function, symbol):
+        """
+        Returns the file path of the response
+        """
+        return os.path.join(
+            self.directory, function, f"{quote(symbol, safe='')}.json.z"
+        )
+
+    def load(self, function, symbol):
+        path = self.get_path(function, symbol)
+        try:
+            if os.path.getmtime(path) < time.time():
+                return None
+            with open(path, "rb") as file:
+                return file.read()
+        except FileNotFoundError:
+            return None
+
+    def store(self, function, symbol, data, ttl):
+        path = self.get_path(function, symbol)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary_path, "wb") as file:
+            file.write(data)
+        expiration_time = time.time() + ttl
+        os.utime(temporary_path, (expiration_time, expiration_time))
+        os.replace(temporary_path, path)
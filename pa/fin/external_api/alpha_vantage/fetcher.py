@@ -0,0 +1,106 @@
+"""
+Concurrent fetching of the AV API responses
+"""
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from . import AlphaVantage, AVFunctions
+from .limiter import WaitingCancelled
+
+
+class TickersFetcher:
+    """
+    Fetches AV API responses of many tickers with the pool of threads, the responses are passed
+    to the consumer through the bounded queue so fetching never runs far ahead of the processing.
+    With the flight only one worker fetches a ticker at a time, tickers refreshed by another
+    worker are yielded with None responses
+    """
+
+    functions = [
+        AVFunctions.overview,
+        AVFunctions.income_statement,
+        AVFunctions.balance_sheet,
+        AVFunctions.time_series_monthly_adjusted,
+    ]
+    # seconds the consumer waits for the next responses before it is notified of the idling
+    idle_interval = 0.5
+
+    def __init__(self, av_api=None, workers=None, queue_size=None, flight=None):
+        self.av_api = av_api or AlphaVantage()
+        self.flight = flight
+        self.workers = workers or settings.ALPHAVANTAGE_FETCH_WORKERS
+        self.queue_size = queue_size or settings.ALPHAVANTAGE_FETCH_QUEUE_SIZE
+
+    def fetch(self, ticker, cancelled=None):
+        """
+        Returns the mapping of the AV function to the response for one ticker
+        """
+        return {
+            function: self.av_api.call(function.value, ticker.symbol, cancelled)
+            for function in self.functions
+        }
+
+    def iterate(self, tickers, on_idle=None, on_error=None):
+        """
+        Yields tickers with their responses in the order of the fetching completion, the
+        exception of any fetch is raised in the consumer thread and stops the other fetches.
+        With on_error the failed ticker and the exception are passed to it instead and the
+        other fetches go on. On_idle is called in the consumer thread while no responses are
+        ready
+        """
+        tickers = list(tickers)
+        responses_queue = queue.Queue(maxsize=self.queue_size)
+        cancelled = threading.Event()
+
+        def fetch_into_queue(ticker):
+            if cancelled.is_set():
+                return
+            # pylint: disable=broad-except
+            try:
+                if self.flight is None or self.flight.lead_or_wait(
+                    ticker.id, cancelled
+                ):
+                    item = (ticker, self.fetch(ticker, cancelled), None)
+                else:
+                    item = (ticker, None, None)
+            except WaitingCancelled:
+                return
+            except Exception as error:
+                item = (ticker, None, error)
+            # pylint: enable=broad-except
+            while not cancelled.is_set():
+                try:
+                    responses_queue.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+
+        executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="alpha_vantage"
+        )
+        futures = [executor.submit(fetch_into_queue, ticker) for ticker in tickers]
+        try:
+            for _ in tickers:
+                while True:
+                    try:
+                        ticker, responses, error = responses_queue.get(
+                            timeout=self.idle_interval
+                        )
+                        break
+                    except queue.Empty:
+                        if on_idle is not None:
+                            on_idle()
+                if error is not None:
+                    if on_error is None:
+                        raise error
+                    on_error(ticker, error)
+                    continue
+                yield ticker, responses
+        finally:
+            cancelled.set()
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=True)
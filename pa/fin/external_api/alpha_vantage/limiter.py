@@ -0,0 +1,279 @@
+"""
+Rate limiters that keep AV API calls within the API plan quota
+"""
+import threading
+import time
+
+
+class WaitingCancelled(Exception):
+    """
+    Raised when waiting for the rate limiter or another worker is cancelled
+    """
+
+
+class Priorities:
+    """
+    Priorities of the calls, background calls yield the quota to interactive ones
+    """
+
+    interactive = "interactive"
+    background = "background"
+
+
+def wait(wait_time, cancelled=None):
+    """
+    Sleeps for wait_time seconds, cancelled is an optional threading.Event that interrupts the
+    waiting with WaitingCancelled
+    """
+    if cancelled is None:
+        time.sleep(wait_time)
+    elif cancelled.wait(wait_time):
+        raise WaitingCancelled()
+
+
+class TokenBucket:
+    """
+    Thread safe token bucket that holds up to capacity tokens and refills them evenly over period
+    seconds
+    """
+
+    def __init__(self, capacity, period):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def refill(self):
+        """
+        Adds tokens accumulated since the last refill, must be called with the lock held
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, reserve=0.0):
+        """
+        Takes one token if it is available and reserve tokens are left, returns the number of
+        seconds to wait otherwise
+        """
+        with self.lock:
+            self.refill()
+            if self.tokens >= 1 + reserve:
+                self.tokens -= 1
+                return 0.0
+            return (1 + reserve - self.tokens) / self.rate
+
+    def release(self):
+        """
+        Returns one previously taken token
+        """
+        with self.lock:
+            self.tokens = min(self.capacity, self.tokens + 1)
+
+    def drain(self):
+        """
+        Removes all available tokens, used when the API reports that the quota is exceeded
+        """
+        with self.lock:
+            self.refill()
+            self.tokens = min(self.tokens, 0.0)
+
+
+class RateLimiter:
+    """
+    Limits calls by the per minute and the per day quotas shared by all threads of the process.
+    Background calls wait while there were interactive calls during the last interactive_window
+    seconds and leave the interactive_reserve share of every quota to interactive calls
+    """
+
+    MINUTE = 60
+    DAY = 60 * 60 * 24
+
+    def __init__(
+        self,
+        calls_per_minute,
+        calls_per_day,
+        interactive_reserve=0.0,
+        interactive_window=MINUTE,
+    ):
+        self.buckets = [
+            TokenBucket(calls_per_minute, self.MINUTE),
+            TokenBucket(calls_per_day, self.DAY),
+        ]
+        self.interactive_reserve = interactive_reserve
+        self.interactive_window = interactive_window
+        self.interactive_called = None
+
+    def acquire(self, cancelled=None, priority=Priorities.interactive):
+        """
+        Blocks until a call of the priority is allowed by all quotas, cancelled is an optional
+        threading.Event that interrupts the waiting
+        """
+        if priority == Priorities.interactive:
+            self.interactive_called = time.monotonic()
+        else:
+            while (
+                self.interactive_called is not None
+                and (
+                    interactive_wait_time := self.interactive_called
+                    + self.interactive_window
+                    - time.monotonic()
+                )
+                > 0
+            ):
+                wait(interactive_wait_time, cancelled)
+
+        while True:
+            wait_time = 0.0
+            acquired_buckets = []
+            for bucket in self.buckets:
+                reserve = (
+                    bucket.capacity * self.interactive_reserve
+                    if priority == Priorities.background
+                    else 0.0
+                )
+                wait_time = bucket.try_acquire(reserve)
+                if wait_time:
+                    break
+                acquired_buckets.append(bucket)
+
+            if not wait_time:
+                return
+            for bucket in acquired_buckets:
+                bucket.release()
+            wait(wait_time, cancelled)
+
+    def throttled(self):
+        """
+        Makes the next calls wait for the per minute quota refill after the API rejected a call
+        """
+        self.buckets[0].drain()
+
+
+class RedisRateLimiter:
+    """
+    Limits calls by the quotas shared by all processes through Redis with the generic cell rate
+    algorithm, every quota is the calls limit per period of seconds stored under its own key
+    """
+
+    # Checks all quotas and reserves the call only when every quota allows it, returns the
+    # number of seconds to wait otherwise. Redis time is used so workers clocks do not matter
+    acquire_script = """
+    local time = redis.call("TIME")
+    local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+    local wait_time = 0
+    local theoretical_arrival_times = {}
+    for i, key in ipairs(KEYS) do
+        local interval = tonumber(ARGV[i * 2 - 1])
+        local limit = tonumber(ARGV[i * 2])
+        local theoretical_arrival_time = math.max(tonumber(redis.call("GET", key) or now), now)
+        local allowed_at = theoretical_arrival_time + interval - limit * interval
+        wait_time = math.max(wait_time, allowed_at - now)
+        theoretical_arrival_times[i] = theoretical_arrival_time + interval
+    end
+    if wait_time > 0 then
+        return tostring(wait_time)
+    end
+    for i, key in ipairs(KEYS) do
+        local expiration = math.ceil((theoretical_arrival_times[i] - now) * 1000) + 1000
+        redis.call("SET", key, tostring(theoretical_arrival_times[i]), "PX", expiration)
+    end
+    return "0"
+    """
+    # Postpones the next calls by the whole period of the quota
+    throttle_script = """
+    local time = redis.call("TIME")
+    local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+    local period = tonumber(ARGV[1])
+    redis.call("SET", KEYS[1], tostring(now + period), "PX", math.ceil(period * 1000) + 1000)
+    """
+
+    def __init__(
+        self,
+        redis_client,
+        key,
+        quotas,
+        interactive_reserve=0.0,
+        interactive_window=RateLimiter.MINUTE,
+    ):
+        self.redis_client = redis_client
+        self.key = key
+        self.quotas = quotas
+        self.interactive_reserve = interactive_reserve
+        self.interactive_window = interactive_window
+        self.metrics_key = f"{key}:metrics"
+        self.interactive_key = f"{key}:interactive"
+        self.acquire_script = redis_client.register_script(self.acquire_script)
+        self.throttle_script = redis_client.register_script(self.throttle_script)
+
+    def get_quota_key(self, name):
+        """
+        Returns the Redis key of the quota state
+        """
+        return f"{self.key}:{name}"
+
+    def acquire(self, cancelled=None, priority=Priorities.interactive):
+        """
+        Blocks until a call of the priority is allowed by all quotas, cancelled is an optional
+        threading.Event that interrupts the waiting. Interactive calls mark the interactive
+        activity for interactive_window seconds, background calls wait while it is marked and
+        leave the interactive_reserve share of every quota to interactive calls
+        """
+        total_wait_time = 0.0
+        if priority == Priorities.interactive:
+            self.redis_client.set(self.interactive_key, 1, ex=self.interactive_window)
+        else:
+            while (
+                interactive_wait_time := self.redis_client.pttl(self.interactive_key)
+            ) > 0:
+                total_wait_time += interactive_wait_time / 1000
+                wait(interactive_wait_time / 1000, cancelled)
+
+        keys = [self.get_quota_key(name) for name in self.quotas]
+        args = []
+        for limit, period in self.quotas.values():
+            available_limit = limit
+            if priority == Priorities.background:
+                available_limit = max(limit * (1 - self.interactive_reserve), 1)
+            args += [period / limit, available_limit]
+
+        while wait_time := float(self.acquire_script(keys=keys, args=args)):
+            total_wait_time += wait_time
+            wait(wait_time, cancelled)
+
+        pipeline = self.redis_client.pipeline()
+        pipeline.hincrby(self.metrics_key, f"{priority}_calls", 1)
+        if total_wait_time:
+            pipeline.hincrby(self.metrics_key, f"{priority}_waits", 1)
+            pipeline.hincrbyfloat(
+                self.metrics_key, f"{priority}_wait_seconds", total_wait_time
+            )
+        pipeline.execute()
+
+    def throttled(self, name="minute"):
+        """
+        Makes the next calls of all processes wait for the quota period after the API rejected
+        a call
+        """
+        _, period = self.quotas[name]
+        self.throttle_script(keys=[self.get_quota_key(name)], args=[period])
+        self.redis_client.hincrby(self.metrics_key, "throttled", 1)
+
+    def get_metrics(self):
+        """
+        Returns the numbers of calls, waited calls and the total wait time per priority and the
+        number of API throttles
+        """
+        metrics = {
+            key.decode(): float(value)
+            for key, value in self.redis_client.hgetall(self.metrics_key).items()
+        }
+        result = {"throttled": int(metrics.get("throttled", 0))}
+        for priority in [Priorities.interactive, Priorities.background]:
+            result[priority] = {
+                "calls": int(metrics.get(f"{priority}_calls", 0)),
+                "waits": int(metrics.get(f"{priority}_waits", 0)),
+                "wait_seconds": metrics.get(f"{priority}_wait_seconds", 0.0),
+            }
+        return result
@@ -0,0 +1,133 @@
+"""
+Single flight coordination of the ticker refreshes between workers
+"""
+import json
+import os
+import socket
+import threading
+import time
+
+from redis.exceptions import LockError
+
+from .limiter import wait
+
+
+class RefreshStates:
+    """
+    States of the ticker refresh
+    """
+
+    fetching = "fetching"
+    writing = "writing"
+    done = "done"
+    failed = "failed"
+
+
+class TickerRefreshFlight:
+    """
+    Lets only one worker refresh a ticker at a time, the others wait for the refresh to finish
+    and reuse its result, the refresh state is stored in Redis and visible to all workers
+    """
+
+    lock_timeout = 60 * 30
+    status_timeout = 60 * 60 * 24
+    poll_interval = 0.5
+
+    def __init__(self, redis_client, owner=None):
+        self.redis_client = redis_client
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+        self.locks = {}
+        self.waiting = 0
+        self.waiting_lock = threading.Lock()
+
+    @staticmethod
+    def get_lock_key(ticker_id):
+        """
+        Returns the Redis key of the ticker refresh lock
+        """
+        return f"ticker_refresh:{ticker_id}"
+
+    @staticmethod
+    def get_status_key(ticker_id):
+        """
+        Returns the Redis key of the ticker refresh status
+        """
+        return f"ticker_refresh:{ticker_id}:status"
+
+    def get_status(self, ticker_id):
+        """
+        Returns the state, the owner and the update time of the last ticker refresh or None
+        """
+        status = self.redis_client.get(self.get_status_key(ticker_id))
+        return json.loads(status) if status else None
+
+    def set_status(self, ticker_id, state):
+        """
+        Stores the state of the ticker refresh
+        """
+        status = {"state": state, "owner": self.owner, "updated": time.time()}
+        self.redis_client.set(
+            self.get_status_key(ticker_id), json.dumps(status), ex=self.status_timeout
+        )
+
+    def lead_or_wait(self, ticker_id, cancelled=None):
+        """
+        Returns True when the caller holds the refresh of the ticker and must finish it, returns
+        False when another worker refreshed the ticker while the caller waited. Cancelled is an
+        optional threading.Event that interrupts the waiting
+        """
+        lock_key = self.get_lock_key(ticker_id)
+        while True:
+            lock = self.redis_client.lock(
+                lock_key, timeout=self.lock_timeout, thread_local=False
+            )
+            if lock.acquire(blocking=False):
+                self.locks[ticker_id] = lock
+                self.set_status(ticker_id, RefreshStates.fetching)
+                return True
+
+            with self.waiting_lock:
+                self.waiting += 1
+            try:
+                while self.redis_client.exists(lock_key):
+                    wait(self.poll_interval, cancelled)
+            finally:
+                with self.waiting_lock:
+                    self.waiting -= 1
+
+            status = self.get_status(ticker_id)
+            if status and status["state"] == RefreshStates.done:
+                return False
+
+    def is_waiting(self):
+        """
+        Returns True when any thread waits for the refresh of another worker
+        """
+        return self.waiting > 0
+
+    def update(self, ticker_id, state):
+        """
+        Updates the state of the held ticker refresh
+        """
+        if ticker_id in self.locks:
+            self.set_status(ticker_id, state)
+
+    def finish(self, ticker_id, state=RefreshStates.done):
+        """
+        Stores the final state of the held ticker refresh and lets other workers proceed
+        """
+        lock = self.locks.pop(ticker_id, None)
+        if lock is None:
+            return
+        self.set_status(ticker_id, state)
+        try:
+            lock.release()
+        except LockError:
+            pass
+
+    def finish_all(self, state=RefreshStates.failed):
+        """
+        Finishes all held ticker refreshes
+        """
+        for ticker_id in list(self.locks):
+            self.finish(ticker_id, state)
@@ -0,0 +1,116 @@
+"""
+Command for comparing the batch and the per ticker fundamentals calculation
+"""
+from datetime import date
+from time import perf_counter
+
+import numpy as np
+from dateutil.relativedelta import relativedelta
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from fin.models.ticker import Ticker, TickerStatement, TickerFundamentals, Statements
+from fin.models.ticker.calculator import FundamentalsCalculator
+
+
+class Command(BaseCommand):
+    """
+    Class for benchmarking the fundamentals calculation on the synthetic statements, all the
+    synthetic data is rolled back
+    """
+
+    help = "Compare the batch and the per ticker fundamentals calculation"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tickers", type=int, default=10000)
+        parser.add_argument("--quarters", type=int, default=24)
+        parser.add_argument(
+            "--sample",
+            type=int,
+            default=100,
+            help="Tickers amount for the per ticker calculation, the result is extrapolated",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+
+    @staticmethod
+    def create_statements(tickers_count, quarters, generator):
+        """
+        Creates synthetic tickers with quarterly statements
+        """
+        Ticker.objects.bulk_create(
+            [Ticker(symbol=f"BENCHMARK{i}", price=1) for i in range(tickers_count)],
+            batch_size=1000,
+        )
+        ticker_ids = list(
+            Ticker.objects.filter(symbol__startswith="BENCHMARK").values_list(
+                "id", flat=True
+            )
+        )
+
+        quarter_ends = [
+            date.today() - relativedelta(months=3 * i) for i in range(quarters)
+        ]
+        statements = [
+            Statements.net_income,
+            Statements.outstanding_shares,
+            Statements.short_term_debt,
+            Statements.total_assets,
+            Statements.total_long_term_debt,
+            Statements.total_shareholder_equity,
+        ]
+        for ticker_id in ticker_ids:
+            values = generator.lognormal(20, 1, (len(statements), quarters)).round(2)
+            TickerStatement.objects.bulk_create(
+                [
+                    TickerStatement(
+                        name=statement,
+                        fiscal_date_ending=fiscal_date_ending,
+                        value=values[i, j],
+                        ticker_id=ticker_id,
+                    )
+                    for i, statement in enumerate(statements)
+                    for j, fiscal_date_ending in enumerate(quarter_ends)
+                ]
+            )
+        return ticker_ids
+
+    @staticmethod
+    def calculate_per_ticker(ticker):
+        """
+        Calculates fundamentals of one ticker like TickerSerializer does for the ticker without
+        materialized fundamentals
+        """
+        TickerFundamentals.calculate([ticker])
+
+    def handle(self, *args, **options):
+        generator = np.random.default_rng(options["seed"])
+
+        with transaction.atomic():
+            start_time = perf_counter()
+            ticker_ids = self.create_statements(
+                options["tickers"], options["quarters"], generator
+            )
+            self.stdout.write(
+                f"Synthetic statements created in {perf_counter() - start_time:.2f}s"
+            )
+
+            start_time = perf_counter()
+            FundamentalsCalculator().calculate_for(ticker_ids)
+            batch_runtime = perf_counter() - start_time
+
+            sample = Ticker.objects.filter(id__in=ticker_ids[: options["sample"]])
+            start_time = perf_counter()
+            for ticker in sample:
+                self.calculate_per_ticker(ticker)
+            per_ticker_runtime = (
+                (perf_counter() - start_time) / len(sample) * len(ticker_ids)
+            )
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"{'path':>12} {'tickers':>8} {'runtime, s':>11}")
+        self.stdout.write(f"{'batch':>12} {len(ticker_ids):>8} {batch_runtime:>11.2f}")
+        self.stdout.write(
+            f"{'per ticker':>12} {len(ticker_ids):>8} {per_ticker_runtime:>11.2f}"
+            f" (extrapolated from {len(sample)} tickers)"
+        )
@@ -0,0 +1,74 @@
+"""
+Command for comparing the portfolio rebalancing engines
+"""
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+
+from fin.models.index import Index
+from fin.models.portfolio import Portfolio
+from fin.models.portfolio.rebalancing import RebalancingEngine, weights_deviation
+
+
+class Command(BaseCommand):
+    """
+    Class for benchmarking the rebalancing engines on the synthetic indices
+    """
+
+    help = "Compare tracking error and runtime of the rebalancing engines"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--tickers", nargs="+", type=int, default=[10, 500, 3000, 9000]
+        )
+        parser.add_argument("--money", type=float, default=10000)
+        parser.add_argument("--repeats", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=0)
+
+    @staticmethod
+    def get_tickers_diff_df(tickers_count, money, generator):
+        """
+        Builds the adjusted index like tickers difference with lognormal weights and prices
+        """
+        weights = generator.lognormal(0, 1.5, tickers_count)
+        tickers_df = pd.DataFrame(
+            {
+                "id": np.arange(tickers_count),
+                "price": np.round(generator.lognormal(4, 1, tickers_count), 2),
+                "weight": weights / weights.sum(),
+            }
+        ).sort_values("weight", ascending=False)
+
+        money_amount = Index.find_money_amount(money * 1.3, tickers_df)
+        Index.evaluate_dataframe(money_amount, tickers_df)
+        return tickers_df[tickers_df.amount > 0]
+
+    def handle(self, *args, **options):
+        generator = np.random.default_rng(options["seed"])
+        money = options["money"]
+
+        self.stdout.write(
+            f"{'tickers':>8} {'engine':>18} {'runtime, ms':>12} "
+            f"{'tracking error':>15} {'unspent money':>14}"
+        )
+        for tickers_count in options["tickers"]:
+            tickers_diff_df = self.get_tickers_diff_df(tickers_count, money, generator)
+            prices = tickers_diff_df.price.to_numpy(dtype=float)
+            amounts = tickers_diff_df.amount.to_numpy(dtype=float)
+            target_costs = RebalancingEngine.get_target_costs(money, prices, amounts)
+
+            for name in Portfolio.rebalancing_engines:
+                engine = Portfolio.get_rebalancing_engine(name)
+                start_time = perf_counter()
+                for _ in range(options["repeats"]):
+                    result = engine.get_amounts(money, prices, amounts)
+                runtime = (perf_counter() - start_time) / options["repeats"] * 1000
+
+                costs = result * prices
+                self.stdout.write(
+                    f"{len(tickers_diff_df):>8} {name:>18} {runtime:>12.2f} "
+                    f"{weights_deviation(money, target_costs, costs):>15.6f} "
+                    f"{money - costs.sum():>14.2f}"
+                )
@@ -0,0 +1,84 @@
+"""
+Command for measuring the application startup import time
+"""
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+LAZY_MODULES = {"numpy", "pandas", "selenium", "seleniumwire", "sklearn"}
+STARTUP_SCRIPT = (
+    "import django; django.setup(); "
+    "from django.urls import get_resolver; get_resolver().url_patterns"
+)
+
+
+def get_import_times():
+    """
+    Runs the application startup with -X importtime in a fresh interpreter, returns the mapping
+    of the imported module to its cumulative import time in seconds and the total
+    """
+    env = os.environ.copy()
+    env.setdefault("DJANGO_SETTINGS_MODULE", "pa.settings")
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", STARTUP_SCRIPT],
+        cwd=settings.BASE_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    import_times = {}
+    total_import_time = 0
+    for line in process.stderr.splitlines()[1:]:
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, module = line.split("|")
+        import_times[module.strip()] = int(cumulative) / 10**6
+        if not module[1:].startswith(" "):
+            total_import_time += int(cumulative) / 10**6
+    return import_times, total_import_time
+
+
+class Command(BaseCommand):
+    """
+    Class for measuring the import time of django.setup() and the URLs loading, the median of
+    the repeats is compared with the budget
+    """
+
+    help = "Measure the application startup import time"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeats", type=int, default=5)
+        parser.add_argument("--budget", type=float, default=1.5, help="Seconds")
+        parser.add_argument("--top", type=int, default=10)
+
+    def handle(self, *args, **options):
+        measurements = sorted(
+            (get_import_times() for _ in range(options["repeats"])),
+            key=lambda measurement: measurement[1],
+        )
+        import_times, total_import_time = measurements[len(measurements) // 2]
+
+        self.stdout.write(f"{'module':>40} {'import time, s':>15}")
+        for module in sorted(import_times, key=import_times.get, reverse=True)[
+            : options["top"]
+        ]:
+            self.stdout.write(f"{module:>40} {import_times[module]:>15.3f}")
+        self.stdout.write(f"{'total':>40} {total_import_time:>15.3f}")
+
+        imported_lazy_modules = {
+            module.split(".")[0] for module in import_times
+        } & LAZY_MODULES
+        if imported_lazy_modules:
+            self.stdout.write(
+                f"Imported at startup: {', '.join(sorted(imported_lazy_modules))}"
+            )
+        if total_import_time > options["budget"]:
+            raise CommandError(
+                f"Startup import time {total_import_time:.2f}s exceeds the budget"
+                f" {options['budget']:.2f}s"
+            )
@@ -0,0 +1,181 @@
+"""
+Command for measuring the ticker statements lookups with the current and the legacy indices
+"""
+from datetime import date
+from time import perf_counter
+
+import numpy as np
+from dateutil.relativedelta import relativedelta
+from django.core.management.base import BaseCommand
+from django.db import connection, models, transaction
+
+from fin.models.ticker import Ticker, TickerStatement, Statements
+from fin.models.ticker.calculator import FundamentalsCalculator
+
+
+class Command(BaseCommand):
+    """
+    Class for benchmarking the hot ticker statements queries on the synthetic statements table,
+    the queries are measured with the current indices and with the legacy unique together index
+    on (fiscal_date_ending, name, ticker_id) plus the ticker_id index, all the synthetic data and
+    the schema changes are rolled back
+    """
+
+    help = "Measure p95 latency of the ticker statements lookups before and after the indexing"
+
+    legacy_unique_together = ("fiscal_date_ending", "name", "ticker_id")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tickers", type=int, default=20000)
+        parser.add_argument(
+            "--quarters",
+            type=int,
+            default=56,
+            help="Statements per name and ticker, 20000 tickers with 56 quarters are 10M rows",
+        )
+        parser.add_argument("--samples", type=int, default=200)
+        parser.add_argument("--seed", type=int, default=0)
+
+    @staticmethod
+    def create_statements(tickers_count, quarters, generator):
+        """
+        Creates synthetic tickers with quarterly statements of every name
+        """
+        Ticker.objects.bulk_create(
+            [Ticker(symbol=f"BENCHMARK{i}", price=1) for i in range(tickers_count)],
+            batch_size=1000,
+        )
+        ticker_ids = list(
+            Ticker.objects.filter(symbol__startswith="BENCHMARK").values_list(
+                "id", flat=True
+            )
+        )
+
+        quarter_ends = [
+            date.today() - relativedelta(months=3 * i) for i in range(quarters)
+        ]
+        # statements are written quarter by quarter for all tickers like the periodic updates
+        # do, so the rows of one ticker are scattered over the table
+        for fiscal_date_ending in quarter_ends:
+            values = generator.lognormal(20, 1, (len(ticker_ids), len(Statements)))
+            TickerStatement.objects.bulk_create(
+                [
+                    TickerStatement(
+                        name=statement,
+                        fiscal_date_ending=fiscal_date_ending,
+                        value=values[i, j].round(2),
+                        ticker_id=ticker_id,
+                    )
+                    for i, ticker_id in enumerate(ticker_ids)
+                    for j, statement in enumerate(Statements)
+                ],
+                batch_size=10000,
+            )
+        return ticker_ids
+
+    @staticmethod
+    def get_queries():
+        """
+        Returns the mapping of the query name to the function that runs it for one ticker
+        """
+        six_years_ago = date.today() - relativedelta(years=6)
+        calculator = FundamentalsCalculator()
+        return {
+            "fundamentals": lambda ticker: calculator.load_statements([ticker.id]),
+            "net income statements": lambda ticker: list(
+                ticker.net_income_statements(six_years_ago).values_list(
+                    "fiscal_date_ending", "value"
+                )
+            ),
+            "outstanding shares": lambda ticker: TickerStatement.objects.filter(
+                name=Statements.outstanding_shares, ticker=ticker
+            )
+            .order_by("-fiscal_date_ending")
+            .first(),
+            "existed dates": lambda ticker: list(
+                TickerStatement.objects.filter(
+                    name=Statements.price, ticker=ticker
+                ).values_list("fiscal_date_ending", flat=True)
+            ),
+        }
+
+    def measure(self, tickers):
+        """
+        Returns the mapping of the query name to its p95 latency in milliseconds
+        """
+        latencies = {}
+        for name, query in self.get_queries().items():
+            durations = []
+            for ticker in tickers:
+                start_time = perf_counter()
+                query(ticker)
+                durations.append((perf_counter() - start_time) * 1000)
+            latencies[name] = np.percentile(durations, 95)
+        return latencies
+
+    def use_legacy_indices(self):
+        """
+        Replaces the current indices of the statements table by the legacy ones
+        """
+        with connection.schema_editor() as schema_editor:
+            for constraint in TickerStatement._meta.constraints:
+                schema_editor.remove_constraint(TickerStatement, constraint)
+            schema_editor.alter_unique_together(
+                TickerStatement, [], [self.legacy_unique_together]
+            )
+            schema_editor.add_index(
+                TickerStatement,
+                models.Index(fields=["ticker"], name="benchmark_ticker_id_idx"),
+            )
+
+    def analyze(self):
+        """
+        Refreshes the planner statistics of the statements table
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {TickerStatement._meta.db_table}")
+
+    def handle(self, *args, **options):
+        generator = np.random.default_rng(options["seed"])
+
+        # SQLite rebuilds the table on the constraints change, that is not allowed with the
+        # foreign key checks enabled
+        constraint_checks_disabled = connection.disable_constraint_checking()
+        try:
+            self.run(options, generator)
+        finally:
+            if constraint_checks_disabled:
+                connection.enable_constraint_checking()
+
+    def run(self, options, generator):
+        """
+        Creates the synthetic statements and measures the queries with both indices
+        """
+        with transaction.atomic():
+            start_time = perf_counter()
+            ticker_ids = self.create_statements(
+                options["tickers"], options["quarters"], generator
+            )
+            self.analyze()
+            self.stdout.write(
+                f"{TickerStatement.objects.count()} statements created in"
+                f" {perf_counter() - start_time:.2f}s"
+            )
+
+            sample_ids = generator.choice(
+                ticker_ids, min(options["samples"], len(ticker_ids)), replace=False
+            )
+            tickers = list(Ticker.objects.filter(id__in=sample_ids.tolist()))
+            current = self.measure(tickers)
+
+            self.use_legacy_indices()
+            self.analyze()
+            legacy = self.measure(tickers)
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(
+            f"{'query':>22} {'legacy p95, ms':>15} {'current p95, ms':>16}"
+        )
+        for name, latency in current.items():
+            self.stdout.write(f"{name:>22} {legacy[name]:>15.2f} {latency:>16.2f}")
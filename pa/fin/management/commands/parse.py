@@ -111,6 +111,10 @@ class Command(BaseCommand):
         )
 
         parsed_index_tickers = index.source.parser.parse()
-        index.update_from_parsed_index_tickers(parsed_index_tickers)
+        churn = index.update_from_parsed_index_tickers(parsed_index_tickers)
 
         self.stdout.write(self.style.SUCCESS('Successfully parsed "%s"' % name))
+        self.stdout.write(
+            "Index tickers created: {created}, updated: {updated}, deleted: {deleted},"
+            " unchanged: {unchanged}".format(**churn)
+        )
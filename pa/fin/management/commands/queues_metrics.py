@@ -0,0 +1,38 @@
+"""
+Command for displaying the tickers updates queues and API quota metrics
+"""
+from django.core.management.base import BaseCommand
+
+from fin.external_api.alpha_vantage import get_default_limiter
+from fin.tasks.queues import get_queues_metrics
+
+
+class Command(BaseCommand):
+    """
+    Class for displaying the queues depths, wait times and API quota usage per priority
+    """
+
+    help = "Display queues depths, wait times and API quota usage"
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'queue':>12} {'depth':>8} {'tasks':>8} {'avg wait, s':>12} {'last wait, s':>13}"
+        )
+        for queue, metrics in get_queues_metrics().items():
+            self.stdout.write(
+                f"{queue:>12} {metrics['depth']:>8} {metrics['tasks']:>8} "
+                f"{metrics['average_wait_seconds']:>12.2f} "
+                f"{metrics['last_wait_seconds']:>13.2f}"
+            )
+
+        limiter = get_default_limiter()
+        if not hasattr(limiter, "get_metrics"):
+            return
+        limiter_metrics = limiter.get_metrics()
+        self.stdout.write(f"API throttles: {limiter_metrics.pop('throttled')}")
+        self.stdout.write(f"{'priority':>12} {'calls':>8} {'waits':>8} {'wait, s':>12}")
+        for priority, metrics in limiter_metrics.items():
+            self.stdout.write(
+                f"{priority:>12} {metrics['calls']:>8} {metrics['waits']:>8} "
+                f"{metrics['wait_seconds']:>12.2f}"
+            )
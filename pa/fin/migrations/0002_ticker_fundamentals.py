@@ -0,0 +1,65 @@
+# Generated by Django 3.2.18 on 2026-10-17 02:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("fin", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TickerFundamentals",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                ("updated", models.DateTimeField(auto_now=True)),
+                (
+                    "annual_earnings_growth",
+                    models.DecimalField(decimal_places=2, max_digits=19, null=True),
+                ),
+                (
+                    "assets_to_equity",
+                    models.DecimalField(decimal_places=2, max_digits=19, null=True),
+                ),
+                (
+                    "debt_to_equity",
+                    models.DecimalField(decimal_places=2, max_digits=19, null=True),
+                ),
+                (
+                    "roa",
+                    models.DecimalField(decimal_places=2, max_digits=19, null=True),
+                ),
+                (
+                    "roe",
+                    models.DecimalField(decimal_places=2, max_digits=19, null=True),
+                ),
+                (
+                    "shares_dilution",
+                    models.DecimalField(decimal_places=2, max_digits=19, null=True),
+                ),
+                (
+                    "ticker",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="fundamentals",
+                        to="fin.ticker",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Ticker fundamentals",
+            },
+        ),
+    ]
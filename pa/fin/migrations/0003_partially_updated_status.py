@@ -0,0 +1,39 @@
+# Generated by Django 3.2.18 on 2026-10-17 02:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("fin", "0002_ticker_fundamentals"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="index",
+            name="status",
+            field=models.IntegerField(
+                choices=[
+                    (0, "Successfully Updated"),
+                    (1, "Updating"),
+                    (2, "Update Failed"),
+                    (3, "Partially Updated"),
+                ],
+                default=0,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="portfolio",
+            name="status",
+            field=models.IntegerField(
+                choices=[
+                    (0, "Successfully Updated"),
+                    (1, "Updating"),
+                    (2, "Update Failed"),
+                    (3, "Partially Updated"),
+                ],
+                default=0,
+            ),
+        ),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 3.2.18 on 2026-10-17 02:27
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+FRESHNESS_STATEMENTS = {
+    "income_statement_date": "net_income",
+    "balance_sheet_date": "total_assets",
+    "price_date": "price",
+}
+
+
+def backfill_tickers_freshness(apps, schema_editor):
+    """
+    Fills the freshness columns of tickers by their latest statements
+    """
+    Ticker = apps.get_model("fin", "Ticker")
+    TickerStatement = apps.get_model("fin", "TickerStatement")
+
+    for field, statement in FRESHNESS_STATEMENTS.items():
+        latest_date = (
+            TickerStatement.objects.filter(ticker_id=OuterRef("pk"), name=statement)
+            .order_by("-fiscal_date_ending")
+            .values("fiscal_date_ending")[:1]
+        )
+        Ticker.objects.update(**{field: Subquery(latest_date)})
+    Ticker.objects.exclude(sector="Unknown").update(
+        overview_updated=models.F("updated")
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("fin", "0003_partially_updated_status"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ticker",
+            name="balance_sheet_date",
+            field=models.DateField(null=True),
+        ),
+        migrations.AddField(
+            model_name="ticker",
+            name="income_statement_date",
+            field=models.DateField(null=True),
+        ),
+        migrations.AddField(
+            model_name="ticker",
+            name="overview_updated",
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name="ticker",
+            name="price_date",
+            field=models.DateField(null=True),
+        ),
+        migrations.AddIndex(
+            model_name="ticker",
+            index=models.Index(fields=["pe"], name="fin_ticker_pe_9ac721_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="ticker",
+            index=models.Index(
+                fields=["income_statement_date"], name="fin_ticker_income__cb2189_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ticker",
+            index=models.Index(
+                fields=["balance_sheet_date"], name="fin_ticker_balance_b9aca4_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ticker",
+            index=models.Index(
+                fields=["price_date"], name="fin_ticker_price_d_b92ebf_idx"
+            ),
+        ),
+        migrations.RunPython(backfill_tickers_freshness, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 3.2.18 on 2026-10-17 02:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("fin", "0004_ticker_freshness"),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="tickerstatement",
+            constraint=models.UniqueConstraint(
+                fields=("ticker", "name", "fiscal_date_ending"),
+                name="ticker_statement_unique",
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="tickerstatement",
+            unique_together=set(),
+        ),
+        migrations.AlterField(
+            model_name="tickerstatement",
+            name="ticker",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="ticker_statements",
+                to="fin.ticker",
+            ),
+        ),
+    ]
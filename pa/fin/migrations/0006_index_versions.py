@@ -0,0 +1,78 @@
+# Generated by Django 3.2.18 on 2026-10-17 02:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("fin", "0005_ticker_statement_lookup_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IndexVersion",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                ("updated", models.DateTimeField(auto_now=True)),
+                ("number", models.PositiveIntegerField()),
+                ("churn", models.JSONField(default=dict)),
+            ],
+        ),
+        migrations.RemoveConstraint(
+            model_name="indexticker",
+            name="index_ticker_unique",
+        ),
+        migrations.RenameField(
+            model_name="index",
+            old_name="tickers",
+            new_name="all_tickers",
+        ),
+        migrations.AddField(
+            model_name="index",
+            name="version",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="indexticker",
+            name="valid_from",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="indexticker",
+            name="valid_to",
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.AddConstraint(
+            model_name="indexticker",
+            constraint=models.UniqueConstraint(
+                fields=("index_id", "ticker_id", "valid_from"),
+                name="index_ticker_version_unique",
+            ),
+        ),
+        migrations.AddField(
+            model_name="indexversion",
+            name="index",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="versions",
+                to="fin.index",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="indexversion",
+            constraint=models.UniqueConstraint(
+                fields=("index_id", "number"), name="index_version_unique"
+            ),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.2.18 on 2026-10-17 02:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("fin", "0006_index_versions"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="index",
+            name="reload_status",
+            field=models.IntegerField(
+                choices=[
+                    (0, "Successfully Updated"),
+                    (1, "Updating"),
+                    (2, "Update Failed"),
+                    (3, "Partially Updated"),
+                ],
+                default=0,
+            ),
+        ),
+        migrations.AddField(
+            model_name="index",
+            name="reload_timings",
+            field=models.JSONField(default=dict),
+        ),
+    ]
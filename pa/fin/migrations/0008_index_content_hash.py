@@ -0,0 +1,18 @@
+# Generated by Django 3.2.18 on 2026-10-17 02:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("fin", "0007_index_reload_status"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="index",
+            name="content_hash",
+            field=models.CharField(blank=True, default="", max_length=64),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.18 on 2026-10-17 03:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("fin", "0008_index_content_hash"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ticker",
+            name="refresh_attempted",
+            field=models.DateTimeField(null=True),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 3.2.18 on 2026-10-17 04:12
+
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+
+def backfill_ticker_fundamentals(apps, schema_editor):
+    """
+    Materializes fundamentals of tickers that have none
+    """
+    # pylint: disable=import-outside-toplevel
+    from fin.models.ticker.calculator import FundamentalsCalculator
+
+    Ticker = apps.get_model("fin", "Ticker")
+    TickerFundamentals = apps.get_model("fin", "TickerFundamentals")
+
+    ticker_ids = list(
+        Ticker.objects.filter(fundamentals__isnull=True)
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+    calculator = FundamentalsCalculator()
+    for i in range(0, len(ticker_ids), BATCH_SIZE):
+        fundamentals_df = calculator.calculate_for(ticker_ids[i : i + BATCH_SIZE])
+        TickerFundamentals.objects.bulk_create(
+            [
+                TickerFundamentals(ticker_id=ticker_id, **fundamentals)
+                for ticker_id, fundamentals in fundamentals_df.to_dict("index").items()
+            ]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("fin", "0009_ticker_refresh_attempted"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_ticker_fundamentals, migrations.RunPython.noop),
+    ]
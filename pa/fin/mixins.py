@@ -13,6 +13,7 @@ from rest_framework.status import (
     HTTP_200_OK,
 )
 
+from fin.models.portfolio import Portfolio
 from fin.models.utils import UpdatingStatus
 from fin.tasks.update_tickers_statements import update_model_tickers_statements_task
 
@@ -59,6 +60,7 @@ class AdjustMixin:
         "skip_sectors": [],
         "skip_industries": [],
         "skip_tickers": [],
+        "rebalancing_engine": Portfolio.default_rebalancing_engine,
     }
 
     def __init__(self, *args, **kwargs):
@@ -82,5 +84,8 @@ class AdjustMixin:
             "skip_sectors": request.GET.getlist("skip-sector[]", []),
             "skip_industries": request.GET.getlist("skip-industry[]", []),
             "skip_tickers": request.GET.getlist("skip-ticker[]", []),
+            "rebalancing_engine": request.GET.get(
+                "rebalancing-engine", Portfolio.default_rebalancing_engine
+            ),
         }
         self.adjust_options.update(options)
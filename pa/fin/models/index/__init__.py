@@ -1,5 +1,5 @@
 """
 Module for Index model and related classes and functions
 """
-from .index import Index, IndexTicker
+from .index import Index, IndexTicker, IndexVersion
 from .source import Source
@@ -1,14 +1,20 @@
 """
 Classes that helps operate with indexes and tickers
 """
+from decimal import Decimal
 
-import pandas as pd
+from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models, transaction
+from django.db.models import F, Q
+from django.utils import timezone
 
+from fin.models.index.parsers.helpers import TickerResolver
 from fin.models.ticker import Ticker
 from fin.models.utils import TimeStampMixin, MAX_DIGITS, UpdatingStatus
 
+ADJUSTING_PRECISION = 1
+
 
 class Index(TimeStampMixin):
     """
@@ -19,7 +25,16 @@ class Index(TimeStampMixin):
     status = models.IntegerField(
         choices=UpdatingStatus.choices, default=UpdatingStatus.successfully_updated
     )
-    tickers = models.ManyToManyField(Ticker, through="fin.IndexTicker")
+    reload_status = models.IntegerField(
+        choices=UpdatingStatus.choices, default=UpdatingStatus.successfully_updated
+    )
+    # durations of the last reload stages in seconds
+    reload_timings = models.JSONField(default=dict)
+    # hash of the source raw data the published version of the index tickers is parsed from
+    content_hash = models.CharField(max_length=64, blank=True, default="")
+    # number of the published version of the index tickers
+    version = models.PositiveIntegerField(default=0)
+    all_tickers = models.ManyToManyField(Ticker, through="fin.IndexTicker")
 
     class Meta:
         """
@@ -37,14 +52,40 @@ class Index(TimeStampMixin):
     def __str__(self):
         return self.source.name
 
+    @property
+    def tickers(self):
+        """
+        Returns tickers of the index version loaded with the index
+        """
+        return Ticker.objects.filter(
+            id__in=self.get_index_tickers().values("ticker_id")
+        )
+
+    def get_index_tickers(self, version=None):
+        """
+        Returns index tickers of the given version, by default of the version loaded with the
+        index, the returned rows never change after the version is published
+        """
+        return IndexTicker.objects.filter(index=self).at_version(
+            self.version if version is None else version
+        )
+
     @transaction.atomic
-    def adjust(self, invested_money: float, extra_money: float, options):
+    def adjust(
+        self,
+        invested_money: float,
+        extra_money: float,
+        options,
+        precision: float = ADJUSTING_PRECISION,
+    ):
         """
         Calculate index adjusted by the amount of money
         """
+        # pylint: disable=import-outside-toplevel
+        import pandas as pd
 
         tickers_query = (
-            IndexTicker.objects.filter(index=self)
+            self.get_index_tickers()
             .exclude(ticker__id__in=options["skip_tickers"])
             .exclude(ticker__stock_exchange__available=False)
             .exclude(ticker__country__in=options["skip_countries"])
@@ -69,22 +110,40 @@ class Index(TimeStampMixin):
         coefficient = 1 / tickers_df.weight.sum()
         tickers_df.iloc[:, 2] *= coefficient
 
-        step = 100
         max_tickers_cost = invested_money + extra_money
-        adjusted_money_amount = invested_money + extra_money
-        while True:
-            adjusted_money_amount += step
-            self.evaluate_dataframe(adjusted_money_amount, tickers_df)
-
-            if tickers_df.cost.sum() > max_tickers_cost:
-                adjusted_money_amount -= step
-                self.evaluate_dataframe(adjusted_money_amount, tickers_df)
-
-                break
+        adjusted_money_amount = self.find_money_amount(
+            max_tickers_cost, tickers_df, precision
+        )
+        self.evaluate_dataframe(adjusted_money_amount, tickers_df)
 
         tickers_df = tickers_df[tickers_df.cost != 0]
         return tickers_df
 
+    @staticmethod
+    def find_money_amount(max_tickers_cost, tickers_df, precision=ADJUSTING_PRECISION):
+        """
+        Bisects the largest amount of money whose rounded tickers basket costs not more than
+        max_tickers_cost. The basket cost is a monotone step function of the money amount and
+        differs from it by at most half of the prices sum, so the search interval and the number
+        of evaluations do not depend on the invested amount
+        """
+        weights = tickers_df.weight.to_numpy(dtype=float)
+        prices = tickers_df.price.to_numpy(dtype=float)
+
+        def basket_cost(money):
+            return ((weights * money / prices).round() * prices).sum()
+
+        half_prices_sum = prices.sum() / 2
+        low = max(max_tickers_cost - half_prices_sum, 0.0)
+        high = max_tickers_cost + half_prices_sum + precision
+        while high - low > precision:
+            middle = (low + high) / 2
+            if basket_cost(middle) > max_tickers_cost:
+                high = middle
+            else:
+                low = middle
+        return low
+
     @staticmethod
     def evaluate_dataframe(money, tickers_df):
         """
@@ -94,18 +153,10 @@ class Index(TimeStampMixin):
         tickers_df.amount = tickers_df.amount.round()
         tickers_df["cost"] = tickers_df.amount * tickers_df.price
 
-    def save(
-        self, force_insert=False, force_update=False, using=None, update_fields=None
-    ):
-        super().save(
-            force_insert=False, force_update=False, using=None, update_fields=None
-        )
-        self.update()
-
-    @transaction.atomic
     def update(self):
         """
-        Update tickers prices and their weights
+        Update tickers prices and their weights, it runs all stages of the reload in the
+        current thread
         """
         if self.source.updatable:
             parsed_index_tickers = self.source.parser.parse()
@@ -113,22 +164,154 @@ class Index(TimeStampMixin):
 
     def update_from_parsed_index_tickers(self, parsed_index_tickers):
         """
-        Creates objects for the relation between the current index and tickers JSON
+        Resolves tickers of the parsed index tickers and reconciles the index tickers with them
+        """
+        parsed_index_tickers = list(parsed_index_tickers)
+        tickers = self.resolve_tickers(parsed_index_tickers)
+        return self.reconcile(parsed_index_tickers, tickers)
+
+    @staticmethod
+    def resolve_tickers(parsed_index_tickers):
+        """
+        Returns tickers of the parsed index tickers, missing tickers are created
+        """
+        return TickerResolver(
+            parsed_index_ticker.ticker for parsed_index_ticker in parsed_index_tickers
+        ).resolve()
+
+    def reconcile(self, parsed_index_tickers, tickers):
+        """
+        Writes the next version of the index tickers next to the published one and publishes it
+        by the version switch, only the changed index tickers are written: the rows of the
+        removed tickers and of the changed weights are closed by the new version, the rows of
+        the new tickers and of the changed weights are opened by it. Readers of the published
+        version are not affected until the switch. Returns the numbers of created, updated,
+        deleted and unchanged index tickers
+        """
+        parsed = {
+            ticker.id: parsed_index_ticker
+            for parsed_index_ticker, ticker in zip(parsed_index_tickers, tickers)
+        }
+        weight_field = IndexTicker._meta.get_field("weight")
+
+        with transaction.atomic():
+            # concurrent reloads of the index wait for each other, readers do not
+            published_version = (
+                Index.objects.select_for_update()
+                .values_list("version", flat=True)
+                .get(pk=self.pk)
+            )
+            version = published_version + 1
+            stored_index_tickers = {
+                index_ticker.ticker_id: index_ticker
+                for index_ticker in self.get_index_tickers(published_version).only(
+                    "id", "ticker_id", "weight"
+                )
+            }
+
+            created_index_tickers = []
+            closed_ids = []
+            updated_count = 0
+            for ticker_id, parsed_index_ticker in parsed.items():
+                weight = weight_field.to_python(parsed_index_ticker.weight).quantize(
+                    Decimal(10) ** -weight_field.decimal_places
+                )
+                index_ticker = stored_index_tickers.pop(ticker_id, None)
+                if index_ticker is not None:
+                    if index_ticker.weight == weight:
+                        continue
+                    closed_ids.append(index_ticker.id)
+                    updated_count += 1
+                created_index_tickers.append(
+                    IndexTicker(
+                        index=self,
+                        raw_data=parsed_index_ticker.raw_data,
+                        ticker_id=ticker_id,
+                        weight=weight,
+                        valid_from=version,
+                    )
+                )
+            deleted_ids = [
+                index_ticker.id for index_ticker in stored_index_tickers.values()
+            ]
+
+            churn = {
+                "created": len(created_index_tickers) - updated_count,
+                "updated": updated_count,
+                "deleted": len(deleted_ids),
+                "unchanged": len(parsed) - len(created_index_tickers),
+            }
+            if not created_index_tickers and not deleted_ids:
+                return churn
+
+            IndexTicker.objects.filter(id__in=closed_ids + deleted_ids).update(
+                valid_to=version, updated=timezone.now()
+            )
+            IndexTicker.objects.bulk_create(created_index_tickers, batch_size=300)
+            IndexVersion.objects.create(index=self, number=version, churn=churn)
+            Index.objects.filter(pk=self.pk).update(version=version)
+
+        self.version = version
+        self.collect_versions()
+        return churn
+
+    def collect_versions(self, keep=None):
+        """
+        Deletes the index tickers and the versions older than the last kept versions
+        """
+        keep = keep or settings.INDEX_VERSIONS_KEEP
+        oldest_version = self.version - keep + 1
+        if oldest_version <= 0:
+            return
+        IndexTicker.objects.filter(index=self, valid_to__lte=oldest_version).delete()
+        IndexVersion.objects.filter(index=self, number__lt=oldest_version).delete()
+
+
+class IndexVersion(TimeStampMixin):
+    """
+    Published version of the index tickers
+    """
+
+    index = models.ForeignKey(Index, on_delete=models.CASCADE, related_name="versions")
+    number = models.PositiveIntegerField()
+    churn = models.JSONField(default=dict)
+
+    def __str__(self):
+        return f"{self.index}.{self.number}"
+
+    class Meta:
+        """
+        Model constraints
         """
-        index_tickers = []
-        for parsed_index_ticker in parsed_index_tickers:
-            ticker = parsed_index_ticker.ticker.get_ticker()
 
-            index_ticker = IndexTicker(
-                index=self,
-                raw_data=parsed_index_ticker.raw_data,
-                ticker=ticker,
-                weight=parsed_index_ticker.weight,
+        constraints = [
+            models.UniqueConstraint(
+                fields=("index_id", "number"), name="index_version_unique"
             )
-            index_tickers.append(index_ticker)
+        ]
 
-        IndexTicker.objects.filter(index=self).delete()
-        IndexTicker.objects.bulk_create(index_tickers, batch_size=300)
+
+class IndexTickerQuerySet(models.QuerySet):
+    """
+    Queries index tickers by the versions of their indices
+    """
+
+    def at_version(self, version):
+        """
+        Returns index tickers valid in the given version
+        """
+        return self.filter(
+            Q(valid_to=None) | Q(valid_to__gt=version), valid_from__lte=version
+        )
+
+    def current(self):
+        """
+        Returns index tickers of the published versions of their indices
+        """
+        return self.filter(
+            Q(valid_to=None) | Q(valid_to__gt=F("index__version")),
+            valid_from__lte=F("index__version"),
+        )
 
 
 class IndexTicker(TimeStampMixin):
@@ -136,9 +319,14 @@ class IndexTicker(TimeStampMixin):
     M2M table between Index and Ticker models
     """
 
+    objects = IndexTickerQuerySet.as_manager()
+
     index = models.ForeignKey(Index, on_delete=models.CASCADE, related_name="index")
     raw_data = models.JSONField(default=dict)
     ticker = models.ForeignKey(Ticker, on_delete=models.CASCADE, related_name="ticker")
+    # the row is valid in the index versions from valid_from to valid_to exclusive
+    valid_from = models.PositiveIntegerField(default=0)
+    valid_to = models.PositiveIntegerField(null=True)
     weight = models.DecimalField(
         max_digits=MAX_DIGITS,
         decimal_places=10,
@@ -155,7 +343,8 @@ class IndexTicker(TimeStampMixin):
 
         constraints = [
             models.UniqueConstraint(
-                fields=("index_id", "ticker_id"), name="index_ticker_unique"
+                fields=("index_id", "ticker_id", "valid_from"),
+                name="index_ticker_version_unique",
             )
         ]
         indexes = [
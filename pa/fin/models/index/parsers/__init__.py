@@ -3,6 +3,7 @@ Parsers for indexes sources
 """
 
 from .amplify import *
+from .fetchers import *
 from .invesco_csv import *
 from .ishares import *
 from .vanguard import *
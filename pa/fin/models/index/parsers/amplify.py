@@ -3,14 +3,10 @@ Parser for Amplify ETFs and related classes
 """
 import io
 import json
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from decimal import Decimal
 
-import pandas as pd
-import requests
-
 from fin.models.stock_exchange import StockExchangeAlias
-from fin.models.ticker import Ticker
 from .helpers import Parser, TickerDataClass, ParsedIndexTicker
 
 
@@ -26,17 +22,17 @@ class AmplifyTicker(TickerDataClass):
     symbol: str
     price: Decimal
 
-    def get_ticker(self):
-        if (ticker_qs := Ticker.objects.filter(cusip=self.cusip)).exists():
-            return ticker_qs.first()
+    def get_ticker(self, resolver):
+        if tickers := resolver.filter_by_keys({"cusip": self.cusip}):
+            return tickers[0]
 
-        if ticker := Ticker.find_by_symbol_and_stock_exchange_id(
+        if ticker := resolver.find_by_symbol_and_stock_exchange_id(
             self.symbol, self.stock_exchange_id
         ):
             if ticker.cusip is not None and ticker.cusip == self.cusip:
                 return ticker
 
-        return Ticker.objects.create(**asdict(self))
+        return resolver.create(self)
 
 
 @dataclass
@@ -57,26 +53,22 @@ class AmplifyParser(Parser):
         "Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:89.0) Gecko/20100101 Firefox/89.0"
     )
 
-    def __init__(self, source):
-        self.raw_data = None
-        self.source_url = source.url
-
-        self.load_data()
-
     def load_data(self):
-        response = requests.get(
-            self.source_url, headers={"User-Agent": self.user_agent}
+        return self.fetcher.fetch(
+            self.source.url, headers={"User-Agent": self.user_agent}
         )
-        self.raw_data = io.StringIO(response.text)
 
-    def parse(self):
+    def parse_data(self, raw_data):
+        # pylint: disable=import-outside-toplevel
+        import pandas as pd
+
         index_name = "IBUY"
         cash_ticker = "Cash&Other"
         stock_exchanges_mapper = dict(
             StockExchangeAlias.objects.values_list("alias", "stock_exchange_id")
         )
 
-        csv_file = pd.read_csv(self.raw_data, thousands=",")
+        csv_file = pd.read_csv(io.StringIO(raw_data), thousands=",")
         ibuy_csv_rows = csv_file[
             (csv_file["Account"] == index_name)
             & (csv_file["StockTicker"] != cash_ticker)
@@ -0,0 +1,235 @@
+"""
+Fetchers of the index sources raw data
+"""
+import hashlib
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+
+def get_request_key(url, params=None):
+    """
+    Returns the stable key of the GET request
+    """
+    key = json.dumps([url, params or {}], sort_keys=True)
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def get_content_hash(raw_data):
+    """
+    Returns the hash of the raw data, the raw data is the text or the JSON serializable object
+    """
+    if not isinstance(raw_data, str):
+        raw_data = json.dumps(raw_data, sort_keys=True, default=str)
+    return hashlib.sha256(raw_data.encode()).hexdigest()
+
+
+def write_atomically(path, text):
+    """
+    Writes the text to the file, readers never see the partially written file
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporary_path, "w", encoding="utf-8") as file:
+        file.write(text)
+    os.replace(temporary_path, path)
+
+
+class Fetcher(ABC):
+    """
+    Fetcher basic class, parsers download their raw data only through the fetcher
+    """
+
+    @abstractmethod
+    def fetch(self, url, params=None, headers=None):
+        """
+        Returns the response text of the GET request
+        """
+
+
+class RequestsFetcher(Fetcher):
+    """
+    Fetches the raw data over HTTP
+    """
+
+    timeout = 60
+
+    def fetch(self, url, params=None, headers=None):
+        response = requests.get(
+            url, params=params, headers=headers, timeout=self.timeout
+        )
+        response.raise_for_status()
+        return response.text
+
+
+class DiskFetcher(Fetcher):
+    """
+    Replays responses stored in the local directory by the request url and params. Responses
+    missing on the disk are fetched by the wrapped fetcher and recorded, without the wrapped
+    fetcher they raise FileNotFoundError
+    """
+
+    def __init__(self, directory, fetcher=None):
+        self.directory = directory
+        self.fetcher = fetcher
+
+    def get_path(self, url, params=None):
+        """
+        Returns the file path of the response
+        """
+        return os.path.join(self.directory, f"{get_request_key(url, params)}.txt")
+
+    def fetch(self, url, params=None, headers=None):
+        path = self.get_path(url, params)
+        try:
+            with open(path, encoding="utf-8") as file:
+                return file.read()
+        except FileNotFoundError:
+            if self.fetcher is None:
+                raise
+
+        text = self.fetcher.fetch(url, params, headers)
+        write_atomically(path, text)
+        return text
+
+
+class ConditionalFetcher(Fetcher):
+    """
+    Fetches the raw data over HTTP with the pooled session and the conditional requests. The last
+    response body is stored on the disk with its ETag and Last-Modified validators, the stored
+    body is returned when the server answers 304 Not Modified, so the unchanged source costs one
+    small request. Downloads and not modified responses are counted
+    """
+
+    timeout = 60
+
+    def __init__(self, directory, pool_size=10):
+        self.directory = directory
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.counters = Counter()
+
+    def get_paths(self, url, params=None):
+        """
+        Returns file paths of the stored body and of its validators
+        """
+        key = get_request_key(url, params)
+        return (
+            os.path.join(self.directory, f"{key}.txt"),
+            os.path.join(self.directory, f"{key}.json"),
+        )
+
+    @staticmethod
+    def load_stored(body_path, validators_path):
+        """
+        Returns the stored body and its validators or None if any of them is missing
+        """
+        try:
+            with open(validators_path, encoding="utf-8") as file:
+                validators = json.load(file)
+            with open(body_path, encoding="utf-8") as file:
+                body = file.read()
+        except FileNotFoundError:
+            return None
+        if validators.get("content_hash") != get_content_hash(body):
+            return None
+        return body, validators
+
+    @staticmethod
+    def store(body_path, validators_path, response):
+        """
+        Stores the response body and its validators, the body is written first so the
+        validators never describe the missing body
+        """
+        write_atomically(body_path, response.text)
+        write_atomically(
+            validators_path,
+            json.dumps(
+                {
+                    "content_hash": get_content_hash(response.text),
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                }
+            ),
+        )
+
+    def fetch(self, url, params=None, headers=None):
+        body_path, validators_path = self.get_paths(url, params)
+        stored = self.load_stored(body_path, validators_path)
+
+        headers = dict(headers or {})
+        if stored is not None:
+            _, validators = stored
+            if validators["etag"]:
+                headers["If-None-Match"] = validators["etag"]
+            if validators["last_modified"]:
+                headers["If-Modified-Since"] = validators["last_modified"]
+
+        response = self.session.get(
+            url, params=params, headers=headers, timeout=self.timeout
+        )
+        if response.status_code == requests.codes.not_modified and stored is not None:
+            self.counters["not_modified"] += 1
+            return stored[0]
+
+        response.raise_for_status()
+        self.counters["downloaded"] += 1
+        self.store(body_path, validators_path, response)
+        return response.text
+
+    def get_metrics(self):
+        """
+        Returns numbers of downloads and not modified responses
+        """
+        return {
+            "downloaded": self.counters["downloaded"],
+            "not_modified": self.counters["not_modified"],
+        }
+
+
+_default_fetcher = None
+_default_fetcher_lock = threading.Lock()
+
+
+def get_default_fetcher():
+    """
+    Returns the conditional fetcher shared by all parsers of the process, so the parsers reuse
+    the pooled connections and the stored responses
+    """
+    # pylint: disable=global-statement
+    global _default_fetcher
+    with _default_fetcher_lock:
+        if _default_fetcher is None:
+            _default_fetcher = ConditionalFetcher(settings.INDEX_SOURCES_CACHE_DIR)
+    return _default_fetcher
+
+
+def load_parsers(parsers, workers=4):
+    """
+    Loads raw data of many parsers with the pool of threads, returns the mapping of the parser to
+    the exception of its loading, parsers loaded successfully are not in the mapping
+    """
+    parsers = list(parsers)
+
+    # pylint: disable=broad-except
+    def load(parser):
+        try:
+            parser.load()
+        except Exception as error:
+            return error
+        return None
+
+    # pylint: enable=broad-except
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        errors = list(executor.map(load, parsers))
+    return {parser: error for parser, error in zip(parsers, errors) if error}
@@ -3,9 +3,14 @@ Helpers for parsers working
 """
 import collections
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
 from decimal import Decimal
 
+from django.db import connection
+
+from fin.models.ticker import Ticker
+from .fetchers import get_default_fetcher
+
 
 class KeysTickerDataClassMixin:
     """
@@ -29,21 +34,41 @@ class KeysTickerDataClassMixin:
 
 class Parser(ABC):
     """
-    Parser basic class
+    Parser basic class, the raw data is loaded lazily on the first parsing, so creating the
+    parser never touches the network. Raw data set before the parsing is not loaded at all
     """
 
     updatable = True
 
+    def __init__(self, source, fetcher=None):
+        self.source = source
+        self.fetcher = fetcher or get_default_fetcher()
+        self.raw_data = None
+
+    def load(self):
+        """
+        Loads raw data once and returns it
+        """
+        if self.raw_data is None:
+            self.raw_data = self.load_data()
+        return self.raw_data
+
     @abstractmethod
     def load_data(self):
         """
-        Fetch raw data
+        Fetch raw data by the fetcher and return it
         """
 
-    @abstractmethod
     def parse(self):
         """
-        Create data classes
+        Create data classes, loads raw data if it is not loaded yet
+        """
+        return self.parse_data(self.load())
+
+    @abstractmethod
+    def parse_data(self, raw_data):
+        """
+        Create data classes from raw data
         """
 
 
@@ -91,7 +116,141 @@ class TickerDataClass(ABC):
     """
 
     @abstractmethod
-    def get_ticker(self):
+    def get_ticker(self, resolver):
+        """
+        Try to get ticker from the tickers loaded by the resolver, if ticker does not exist,
+        creates new
+        """
+
+
+class TickerResolver:
+    """
+    Resolves parsed tickers of the whole index at once, the candidate tickers are loaded with a
+    few IN queries and indexed in memory by cusip, isin, sedol and symbol, the matching rules of
+    the parsed tickers are applied to these indices, the new tickers and the changed prices are
+    written in bulk
+    """
+
+    identifiers = ["cusip", "isin", "sedol"]
+    chunk_size = 1000
+
+    def __init__(self, parsed_tickers):
+        self.parsed_tickers = list(parsed_tickers)
+        self.by_identifier = {
+            identifier: collections.defaultdict(list) for identifier in self.identifiers
+        }
+        self.by_symbol = collections.defaultdict(list)
+        self.created_tickers = []
+        self.updated_tickers = {}
+
+    def load(self):
+        """
+        Loads all tickers that match any identifier or symbol of the parsed tickers and builds
+        the indices, tickers are indexed in the primary key order
+        """
+        tickers = {}
+        for field in self.identifiers + ["symbol"]:
+            values = list(
+                {
+                    getattr(parsed_ticker, field, None)
+                    for parsed_ticker in self.parsed_tickers
+                }
+                - {None, ""}
+            )
+            for i in range(0, len(values), self.chunk_size):
+                tickers.update(
+                    (ticker.id, ticker)
+                    for ticker in Ticker.objects.filter(
+                        **{f"{field}__in": values[i : i + self.chunk_size]}
+                    )
+                )
+        for ticker_id in sorted(tickers):
+            self.add(tickers[ticker_id])
+
+    def add(self, ticker):
         """
-        Try to get ticker from DB, if ticker does not exist in DB, creates new
+        Adds the ticker to the indices
         """
+        for identifier in self.identifiers:
+            if value := getattr(ticker, identifier):
+                self.by_identifier[identifier][value].append(ticker)
+        self.by_symbol[ticker.symbol].append(ticker)
+
+    def filter_by_keys(self, keys):
+        """
+        Returns tickers that match any of the keys, keys is the mapping of the identifier to its
+        value
+        """
+        tickers = {}
+        for identifier, value in keys.items():
+            for ticker in self.by_identifier[identifier].get(value, []):
+                tickers.setdefault(id(ticker), ticker)
+        return list(tickers.values())
+
+    def filter_by_symbol(self, symbol):
+        """
+        Returns tickers with the symbol
+        """
+        return list(self.by_symbol.get(symbol, []))
+
+    def find_by_symbol_and_stock_exchange_id(self, symbol, stock_exchange_id):
+        """
+        Heuristically try find a ticker by unreliable fields, the same rules as
+        Ticker.find_by_symbol_and_stock_exchange_id
+        """
+        tickers = self.filter_by_symbol(symbol)
+
+        if len(tickers) == 1:
+            return tickers[0]
+
+        if len(tickers) > 1:
+            tickers = [
+                ticker
+                for ticker in tickers
+                if ticker.stock_exchange_id == stock_exchange_id
+            ]
+            if len(tickers) > 1:
+                raise NotImplementedError(
+                    "Cannot identify the stock security, there are need some extra actions"
+                )
+            if len(tickers) == 1:
+                return tickers[0]
+
+        return None
+
+    def create(self, parsed_ticker):
+        """
+        Creates the ticker from the parsed ticker, it is written on the resolving end
+        """
+        ticker = Ticker(**asdict(parsed_ticker))
+        self.created_tickers.append(ticker)
+        self.add(ticker)
+        return ticker
+
+    def update_price(self, ticker, price):
+        """
+        Sets the ticker price, it is written on the resolving end
+        """
+        ticker.price = price
+        if ticker.id is not None:
+            self.updated_tickers[ticker.id] = ticker
+
+    def resolve(self):
+        """
+        Returns tickers in the order of the parsed tickers
+        """
+        self.load()
+        tickers = [
+            parsed_ticker.get_ticker(self) for parsed_ticker in self.parsed_tickers
+        ]
+
+        if connection.features.can_return_rows_from_bulk_insert:
+            Ticker.objects.bulk_create(self.created_tickers, batch_size=1000)
+        else:
+            # the primary keys are not returned by the bulk insert on this backend
+            for ticker in self.created_tickers:
+                ticker.save()
+        Ticker.objects.bulk_update(
+            list(self.updated_tickers.values()), ["price"], batch_size=1000
+        )
+        return tickers
@@ -2,13 +2,10 @@
 Parser for Invesco CSVs and related classes
 """
 import json
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from decimal import Decimal
 from io import StringIO
 
-import pandas as pd
-
-from fin.models.ticker import Ticker
 from .helpers import ParsedIndexTicker
 from .helpers import Parser, TickerDataClass
 
@@ -25,20 +22,20 @@ class InvescoCSVTicker(TickerDataClass):
     sector: str
     symbol: str
 
-    def get_ticker(self):
-        if (ticker_qs := Ticker.objects.filter(cusip=self.cusip)).exists():
-            return ticker_qs.first()
+    def get_ticker(self, resolver):
+        if tickers := resolver.filter_by_keys({"cusip": self.cusip}):
+            return tickers[0]
 
-        ticker_qs = Ticker.objects.filter(symbol=self.symbol)
-        if ticker_qs.count() > 1:
+        tickers = resolver.filter_by_symbol(self.symbol)
+        if len(tickers) > 1:
             raise NotImplementedError(
                 "Cannot identify the stock security, there are need some extra actions"
             )
-        if ticker_qs.count() == 1:
-            ticker = ticker_qs.first()
+        if len(tickers) == 1:
+            ticker = tickers[0]
             if ticker.cusip is not None and ticker.cusip == self.cusip:
                 return ticker
-        return Ticker.objects.create(**asdict(self))
+        return resolver.create(self)
 
 
 @dataclass
@@ -57,16 +54,16 @@ class InvescoCSVParser(Parser):
 
     updatable = False
 
-    def __init__(self, _):
-        self.csv_file = None
-
     def load_data(self):
-        raise NotImplementedError
+        raise NotImplementedError("Invesco indices are imported from CSV files")
+
+    def parse_data(self, raw_data):
+        # pylint: disable=import-outside-toplevel
+        import pandas as pd
 
-    def parse(self):
         cash_identifier = "CASHUSD00"
 
-        raw_index_ticker_rows = pd.read_csv(StringIO(self.csv_file), sep=",")
+        raw_index_ticker_rows = pd.read_csv(StringIO(raw_data), sep=",")
         index_ticker_rows = raw_index_ticker_rows[
             raw_index_ticker_rows["Security Identifier"] != cash_identifier
         ]
@@ -2,18 +2,11 @@
 Parser for IShares ETFs and related classes
 """
 import json
-import operator
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from decimal import Decimal
-from functools import reduce
 from io import StringIO
 
-import pandas as pd
-import requests
-from django.db.models import Q
-
 from fin.models.stock_exchange import StockExchangeAlias
-from fin.models.ticker import Ticker
 from .helpers import (
     TickerDataClass,
     ParsedIndexTicker,
@@ -39,16 +32,13 @@ class ISharesTicker(TickerDataClass, KeysTickerDataClassMixin):
     stock_exchange_id: int
     symbol: str
 
-    def get_ticker(self):
-        keys = self.get_keys()
-        ticker_qs = Ticker.objects.filter(
-            reduce(operator.or_, [Q(**{k: v}) for k, v in keys.items()])
-        )
-        if ticker_qs.count() == 1:
-            return ticker_qs.first()
+    def get_ticker(self, resolver):
+        tickers = resolver.filter_by_keys(self.get_keys())
+        if len(tickers) == 1:
+            return tickers[0]
 
         # pylint: disable=too-many-boolean-expressions
-        if ticker := Ticker.find_by_symbol_and_stock_exchange_id(
+        if ticker := resolver.find_by_symbol_and_stock_exchange_id(
             self.symbol, self.stock_exchange_id
         ):
             if (
@@ -59,7 +49,7 @@ class ISharesTicker(TickerDataClass, KeysTickerDataClassMixin):
                 return ticker
         # pylint: enable=too-many-boolean-expressions
 
-        return Ticker.objects.create(**asdict(self))
+        return resolver.create(self)
 
 
 # pylint: enable=too-many-instance-attributes
@@ -79,30 +69,26 @@ class ISharesParser(Parser, ResolveDuplicatesMixin):
     Parser for IShares indexes
     """
 
-    def __init__(self, source):
-        self.raw_data = None
-        self.source_url = source.url
-        self.params = source.isharessourceparams
-
-        self.load_data()
-
     def load_data(self):
         tickers_data_start_word = "Ticker"
-        response = requests.get(
-            self.source_url,
+        params = self.source.isharessourceparams
+        text = self.fetcher.fetch(
+            self.source.url,
             params={
-                "fileType": self.params.file_type,
-                "fileName": self.params.file_name,
-                "dataType": self.params.data_type,
+                "fileType": params.file_type,
+                "fileName": params.file_name,
+                "dataType": params.data_type,
             },
         )
-        tickers_data_start_index = response.text.find(tickers_data_start_word)
-        self.raw_data = StringIO(response.text[tickers_data_start_index:])
+        return text[text.find(tickers_data_start_word) :]
+
+    def parse_data(self, raw_data):
+        # pylint: disable=import-outside-toplevel
+        import pandas as pd
 
-    def parse(self):
         equity_name = "Equity"
 
-        index_df = pd.read_csv(self.raw_data, thousands=",")
+        index_df = pd.read_csv(StringIO(raw_data), thousands=",")
         index_df = index_df[
             (index_df["Asset Class"] == equity_name)
             & (index_df["Price"] > 0)
@@ -1,15 +1,10 @@
 """
 Parser for Vanguard ETFs and related classes
 """
-import operator
 from dataclasses import dataclass, asdict
 from decimal import Decimal
-from functools import reduce
 
-import pandas as pd
-from django.db.models import Q
 
-from fin.models.ticker import Ticker
 from .helpers import (
     TickerDataClass,
     ParsedIndexTicker,
@@ -32,29 +27,24 @@ class VanguardTicker(TickerDataClass, KeysTickerDataClassMixin):
     sedol: str
     symbol: str
 
-    def get_ticker(self):
-        keys = self.get_keys()
-        ticker_qs = Ticker.objects.filter(
-            reduce(operator.or_, [Q(**{k: v}) for k, v in keys.items()])
-        )
+    def get_ticker(self, resolver):
+        tickers = resolver.filter_by_keys(self.get_keys())
 
-        if ticker_qs.count() == 0:
-            return Ticker.objects.create(**asdict(self))
+        if len(tickers) == 0:
+            return resolver.create(self)
 
-        if ticker_qs.count() == 1:
-            ticker = ticker_qs.first()
-            ticker.price = self.price
-            ticker.save()
+        if len(tickers) == 1:
+            ticker = tickers[0]
+            resolver.update_price(ticker, self.price)
             return ticker
 
-        ticker_qs = ticker_qs.filter(symbol=self.symbol)
-        if ticker_qs.count() == 0:
+        tickers = [ticker for ticker in tickers if ticker.symbol == self.symbol]
+        if len(tickers) == 0:
             raise NotImplementedError(f"Need further investigation - {asdict(self)}")
 
-        if ticker_qs.count() == 1:
-            ticker = ticker_qs.first()
-            ticker.price = self.price
-            ticker.save()
+        if len(tickers) == 1:
+            ticker = tickers[0]
+            resolver.update_price(ticker, self.price)
             return ticker
         raise NotImplementedError(f"Duplicated ticker - {asdict(self)}")
 
@@ -75,14 +65,14 @@ class VanguardParser(Parser, ResolveDuplicatesMixin):
 
     updatable = False
 
-    def __init__(self, _):
-        self.raw_data = None
-
     def load_data(self):
-        raise NotImplementedError
+        raise NotImplementedError("Vanguard indices are loaded by the parse command")
+
+    def parse_data(self, raw_data):
+        # pylint: disable=import-outside-toplevel
+        import pandas as pd
 
-    def parse(self):
-        dataframe = pd.DataFrame(self.raw_data)
+        dataframe = pd.DataFrame(raw_data)
 
         extra_columns = [
             "type",
@@ -52,18 +52,18 @@ class Source(models.Model):
     updatable = models.BooleanField(default=True)
     url = models.URLField(unique=True)
 
-    def __init__(self, *args, **kwargs):
-        self._parser = None
-        super().__init__(*args, **kwargs)
-
     def __str__(self):
         return str(self.name)
 
+    def get_parser(self, fetcher=None):
+        """
+        Creates the parser instance, raw data is loaded by the fetcher on the first parsing
+        """
+        return self.parsers_mapper[self.parser_name](self, fetcher)
+
     @cached_property
     def parser(self):
         """
-        Creates the parser instance and caches it
+        Creates the parser instance with the default fetcher and caches it
         """
-        if self._parser is None:
-            self._parser = self.parsers_mapper[self.parser_name](self)
-        return self._parser
+        return self.get_parser()
@@ -6,6 +6,7 @@ from decimal import Decimal
 from django.db import models
 from django.db.models import DecimalField, F, Sum
 from django.db.models.functions import Cast
+from django.utils.module_loading import import_string
 
 from fin.models.account import Account
 from fin.models.index import Index
@@ -22,6 +23,14 @@ class Portfolio(TimeStampMixin):
     Class that represents the portfolio
     """
 
+    default_rebalancing_engine = "largest_remainder"
+    rebalancing_engines = {
+        "exact": "fin.models.portfolio.rebalancing.ExactRebalancingEngine",
+        "greedy": "fin.models.portfolio.rebalancing.GreedyRebalancingEngine",
+        "largest_remainder": "fin.models.portfolio.rebalancing."
+        "LargestRemainderRebalancingEngine",
+    }
+
     name = models.CharField(max_length=100)
     status = models.IntegerField(
         choices=UpdatingStatus.choices, default=UpdatingStatus.successfully_updated
@@ -69,9 +78,14 @@ class Portfolio(TimeStampMixin):
 
         tickers_df = index.adjust(float(portfolio_tickers_sum), extra_money, options)
         tickers_diff_df = self.tickers_difference(tickers_df, portfolio_tickers)
-        packed_ticker_diff = self.pack_tickers_difference(extra_money, tickers_diff_df)
+        rebalancing_engine = self.get_rebalancing_engine(
+            options.get("rebalancing_engine", self.default_rebalancing_engine)
+        )
+        packed_ticker_diff = rebalancing_engine.pack(extra_money, tickers_diff_df)
 
-        tickers_qs = Ticker.objects.filter(id__in=packed_ticker_diff.keys())
+        tickers_qs = Ticker.objects.filter(
+            id__in=packed_ticker_diff.keys()
+        ).select_related("fundamentals", "stock_exchange")
         response = TickerSerializer(tickers_qs, many=True).data
         for ticker in response:
             ticker.update(packed_ticker_diff[ticker["id"]])
@@ -93,45 +107,30 @@ class Portfolio(TimeStampMixin):
         PortfolioTicker.objects.filter(portfolio=self).delete()
         PortfolioTicker.objects.bulk_create(portfolio_tickers)
 
-    @staticmethod
-    def pack_tickers_difference(money, tickers_diff_df):
+    @classmethod
+    def get_rebalancing_engine(cls, name):
         """
-        Tries to pack the tickers difference so that the tickers sum is less than the money
-        parameter
+        Returns the rebalancing engine instance by the name, engines are imported on the first
+        use to keep numpy out of the application startup
         """
-        result = {}
-        min_price = tickers_diff_df.price.min()
-        for _, ticker_df_row in tickers_diff_df.iterrows():
-            max_amount = money // float(ticker_df_row.price)
-
-            if max_amount == 0:
-                continue
-            if max_amount < ticker_df_row.amount:
-                ticker_df_row.amount = max_amount
-            ticker_df_row.cost = round(ticker_df_row.amount * ticker_df_row.price, 2)
-
-            result[ticker_df_row.id] = {
-                "amount": ticker_df_row.amount,
-                "cost": ticker_df_row.cost,
-            }
-
-            money -= ticker_df_row.cost
-            if money < min_price:
-                break
-
-        return result
+        return import_string(cls.rebalancing_engines[name])()
 
     @staticmethod
     def tickers_difference(tickers_df, portfolio_tickers):
         """
         Excludes tickers already present in the portfolio from the adjusted index tickers
         """
-        matched_portfolio_tickers = portfolio_tickers.filter(
-            ticker__id__in=tickers_df.id.values
-        )
-        for matched_ticker in matched_portfolio_tickers:
-            condition = tickers_df.id == matched_ticker.ticker.id
-            tickers_df.loc[condition, "amount"] -= matched_ticker.amount
+        # pylint: disable=import-outside-toplevel
+        import pandas as pd
+
+        portfolio_amounts = pd.DataFrame(
+            portfolio_tickers.filter(ticker__id__in=tickers_df.id.values).values_list(
+                "ticker_id", "amount"
+            ),
+            columns=["id", "portfolio_amount"],
+        ).astype({"id": object, "portfolio_amount": float})
+        tickers_df = tickers_df.merge(portfolio_amounts, on="id", how="left")
+        tickers_df.amount -= tickers_df.pop("portfolio_amount").fillna(0)
 
         tickers_df = tickers_df[tickers_df.amount > 0]
         return tickers_df
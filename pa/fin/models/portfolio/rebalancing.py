@@ -0,0 +1,168 @@
+"""
+Engines that decide how many whole shares of every ticker to buy for the money
+"""
+from abc import ABC, abstractmethod
+
+import numpy as np
+from django.conf import settings
+
+
+def weights_deviation(money, target_costs, costs):
+    """
+    Tracking error of the bought tickers, the root of the sum of squared differences between the
+    desired and the achieved weights of every ticker, unspent money included
+    """
+    if money <= 0:
+        return 0.0
+    return float(np.sqrt(np.sum(((costs - target_costs) / money) ** 2)))
+
+
+class RebalancingEngine(ABC):
+    """
+    Rebalancing engine basic class
+    """
+
+    @abstractmethod
+    def get_amounts(self, money, prices, amounts):
+        """
+        Returns the array of shares amounts to buy, prices and amounts are the arrays of the
+        tickers prices and the desired shares amounts ordered by the index weight
+        """
+
+    @staticmethod
+    def get_target_costs(money, prices, amounts):
+        """
+        Returns desired tickers costs scaled down to the money
+        """
+        target_costs = prices * amounts
+        total_cost = target_costs.sum()
+        if total_cost > money:
+            target_costs *= money / total_cost
+        return target_costs
+
+    def pack(self, money, tickers_diff_df):
+        """
+        Picks tickers from the tickers difference so that the tickers sum is less than the money
+        parameter, returns the mapping of the ticker id to the amount and the cost
+        """
+        prices = tickers_diff_df.price.to_numpy(dtype=float)
+        amounts = self.get_amounts(
+            money, prices, tickers_diff_df.amount.to_numpy(dtype=float)
+        )
+
+        result = {}
+        for ticker_id, price, amount in zip(tickers_diff_df.id, prices, amounts):
+            if amount > 0:
+                result[int(ticker_id)] = {
+                    "amount": float(amount),
+                    "cost": round(float(amount * price), 2),
+                }
+        return result
+
+
+class GreedyRebalancingEngine(RebalancingEngine):
+    """
+    Buys tickers one by one in the index weight order while the money allows
+    """
+
+    def get_amounts(self, money, prices, amounts):
+        result = np.zeros_like(amounts)
+        if not prices.size:
+            return result
+
+        min_price = prices.min()
+        for i, (price, amount) in enumerate(zip(prices, amounts)):
+            max_amount = money // price
+            if max_amount == 0:
+                continue
+            result[i] = min(max_amount, amount)
+
+            money -= round(result[i] * price, 2)
+            if money < min_price:
+                break
+        return result
+
+
+class LargestRemainderRebalancingEngine(RebalancingEngine):
+    """
+    Buys the whole part of the tickers amounts scaled down to the money and spends the rest of
+    the money on tickers with the largest fractional parts, cheaper tickers fill the leftover
+    """
+
+    def get_amounts(self, money, prices, amounts):
+        fractional_amounts = self.get_target_costs(money, prices, amounts) / prices
+        whole_amounts = np.floor(amounts)
+        result = np.minimum(np.floor(fractional_amounts), whole_amounts)
+        leftover = money - (result * prices).sum()
+
+        remainders = fractional_amounts - result
+        candidates = np.flatnonzero((remainders > 0) & (result < whole_amounts))
+        candidates = candidates[np.argsort(-remainders[candidates], kind="stable")]
+        while candidates.size:
+            candidates = candidates[prices[candidates] <= leftover]
+            fitted = np.cumsum(prices[candidates]) <= leftover
+            if not fitted.any():
+                break
+            result[candidates[fitted]] += 1
+            leftover -= prices[candidates[fitted]].sum()
+            candidates = candidates[~fitted]
+        return result
+
+
+class ExactRebalancingEngine(RebalancingEngine):
+    """
+    Finds amounts with the minimal weights deviation with the branch and bound search, falls back
+    to the fallback engine when the problem has more than max_combinations amounts combinations,
+    REBALANCING_EXACT_MAX_COMBINATIONS by default
+    """
+
+    def __init__(self, max_combinations=None, fallback=None):
+        self.max_combinations = (
+            max_combinations or settings.REBALANCING_EXACT_MAX_COMBINATIONS
+        )
+        self.fallback = fallback or LargestRemainderRebalancingEngine()
+
+    def get_amounts(self, money, prices, amounts):
+        whole_amounts = np.floor(amounts).astype(int)
+        if np.prod(whole_amounts + 1, dtype=float) > self.max_combinations:
+            return self.fallback.get_amounts(money, prices, amounts)
+
+        target_costs = self.get_target_costs(money, prices, amounts)
+        order = np.argsort(-prices, kind="stable")
+        prices, amounts, target_costs = (
+            prices[order],
+            whole_amounts[order],
+            target_costs[order],
+        )
+
+        best_amounts = np.zeros(prices.size)
+        best_error = (target_costs**2).sum()
+        current_amounts = np.zeros(prices.size)
+
+        def search(position, money_left, error):
+            nonlocal best_error
+            if position == prices.size:
+                if error < best_error:
+                    best_error = error
+                    best_amounts[:] = current_amounts
+                return
+
+            price, target_cost = prices[position], target_costs[position]
+            max_amount = min(amounts[position], int(money_left // price))
+            # The closest to the target amounts go first to find good bounds early
+            closest_amount = min(max(round(target_cost / price), 0), max_amount)
+            for amount in sorted(
+                range(max_amount + 1), key=lambda x: abs(x - closest_amount)
+            ):
+                amount_error = error + (amount * price - target_cost) ** 2
+                if amount_error >= best_error:
+                    continue
+                current_amounts[position] = amount
+                search(position + 1, money_left - amount * price, amount_error)
+            current_amounts[position] = 0
+
+        search(0, money, 0.0)
+
+        result = np.zeros(prices.size)
+        result[order] = best_amounts
+        return result
@@ -2,3 +2,4 @@
 Module for Ticker model and related classes and functions
 """
 from fin.models.ticker.ticker import Ticker, TickerStatement, Statements
+from fin.models.ticker.fundamentals import TickerFundamentals
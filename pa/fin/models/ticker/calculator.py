@@ -0,0 +1,236 @@
+"""
+Vectorized calculation of the ticker fundamentals, imported lazily to keep pandas out of the
+application startup
+"""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from fin.models.ticker.ticker import TickerStatement, Statements
+
+
+def earnings_growth(net_income, quarter=4):
+    """
+    Slope of the rolling yearly net income relative to the average yearly net income in percents,
+    net income is the array of the quarterly values ordered from the oldest to the latest
+    """
+    yearly_earnings = np.convolve(
+        np.asarray(net_income, dtype=float), np.ones(quarter), mode="valid"
+    )
+    time_points = np.arange(yearly_earnings.size)
+
+    time_points_deviation = time_points - time_points.mean()
+    denominator = (time_points_deviation**2).sum()
+    slope = (
+        (time_points_deviation * yearly_earnings).sum() / denominator
+        if denominator
+        else 0.0
+    )
+    return float(slope * quarter / yearly_earnings.mean() * 100)
+
+
+class FundamentalsCalculator:
+    """
+    Calculates fundamentals of many tickers at once from one statements query
+    """
+
+    quarter = 4
+    max_net_income_statements = 23
+    statements = [
+        Statements.net_income,
+        Statements.outstanding_shares,
+        Statements.short_term_debt,
+        Statements.total_assets,
+        Statements.total_long_term_debt,
+        Statements.total_shareholder_equity,
+    ]
+    columns = [
+        "annual_earnings_growth",
+        "assets_to_equity",
+        "debt_to_equity",
+        "roa",
+        "roe",
+        "shares_dilution",
+    ]
+
+    def __init__(self, today=None):
+        self.today = pd.Timestamp(today or date.today())
+
+    def load_statements(self, ticker_ids):
+        """
+        Loads statements of the given tickers into the dataframe
+        """
+        statements = TickerStatement.objects.filter(
+            ticker_id__in=ticker_ids, name__in=self.statements
+        ).values_list("ticker_id", "name", "fiscal_date_ending", "value")
+        statements_df = pd.DataFrame(
+            statements, columns=["ticker_id", "name", "fiscal_date_ending", "value"]
+        )
+        statements_df.fiscal_date_ending = pd.to_datetime(
+            statements_df.fiscal_date_ending
+        )
+        statements_df.value = statements_df.value.astype(float)
+        return statements_df.sort_values(
+            ["ticker_id", "name", "fiscal_date_ending"], ascending=[True, True, False]
+        )
+
+    def calculate_for(self, ticker_ids):
+        """
+        Returns the dataframe of fundamentals indexed by the ticker id
+        """
+        ticker_ids = list(ticker_ids)
+        statements_df = self.load_statements(ticker_ids)
+        fundamentals_df = pd.concat(
+            [
+                self.annual_earnings_growth(statements_df),
+                self.debt(statements_df),
+                self.returns_ratios(statements_df),
+                self.shares_dilution(statements_df),
+            ],
+            axis=1,
+        )
+        fundamentals_df = fundamentals_df.reindex(
+            index=pd.Index(ticker_ids, name="ticker_id"), columns=self.columns
+        )
+        fundamentals_df = fundamentals_df.replace([np.inf, -np.inf], np.nan).round(2)
+        return fundamentals_df.astype(object).where(fundamentals_df.notna(), None)
+
+    @staticmethod
+    def get_statement(statements_df, statement):
+        """
+        Returns rows of one statement ordered from the latest to the oldest per ticker
+        """
+        return statements_df[statements_df["name"] == statement]
+
+    def annual_earnings_growth(self, statements_df):
+        """
+        Slope of the rolling yearly net income fitted with the closed form least squares
+        relative to the average yearly net income
+        """
+        almost_six_years_ago = self.today - pd.DateOffset(years=5, months=11)
+        net_income = self.get_statement(statements_df, Statements.net_income)
+        net_income = net_income[net_income.fiscal_date_ending >= almost_six_years_ago]
+        net_income = net_income[
+            net_income.groupby("ticker_id").cumcount() < self.max_net_income_statements
+        ].iloc[::-1]
+
+        yearly_earnings = (
+            net_income.groupby("ticker_id")
+            .value.rolling(self.quarter)
+            .sum()
+            .dropna()
+            .reset_index(level=0)
+        )
+        yearly_earnings["time_point"] = yearly_earnings.groupby("ticker_id").cumcount()
+        yearly_earnings["time_point_value"] = (
+            yearly_earnings.time_point * yearly_earnings.value
+        )
+        yearly_earnings["time_point_square"] = yearly_earnings.time_point**2
+
+        sums = yearly_earnings.groupby("ticker_id").agg(
+            count=("value", "size"),
+            time_points=("time_point", "sum"),
+            values=("value", "sum"),
+            time_points_values=("time_point_value", "sum"),
+            time_points_squares=("time_point_square", "sum"),
+        )
+        denominator = sums["count"] * sums.time_points_squares - sums.time_points**2
+        slope = (
+            (
+                sums["count"] * sums.time_points_values
+                - sums.time_points * sums["values"]
+            )
+            / denominator.where(denominator != 0)
+        ).fillna(0)
+        average_earnings = sums["values"] / sums["count"]
+        return (slope * self.quarter / average_earnings * 100).rename(
+            "annual_earnings_growth"
+        )
+
+    def debt(self, statements_df):
+        """
+        Debt to equity and assets to equity ratios on the latest date with all needed statements
+        """
+        balance_sheet = statements_df[
+            statements_df["name"].isin(
+                [
+                    Statements.short_term_debt,
+                    Statements.total_assets,
+                    Statements.total_long_term_debt,
+                    Statements.total_shareholder_equity,
+                ]
+            )
+        ].pivot_table(
+            index=["ticker_id", "fiscal_date_ending"],
+            columns="name",
+            values="value",
+            aggfunc="first",
+        )
+        balance_sheet = balance_sheet.reindex(
+            columns=[
+                Statements.short_term_debt,
+                Statements.total_assets,
+                Statements.total_long_term_debt,
+                Statements.total_shareholder_equity,
+            ]
+        ).dropna()
+        latest_balance_sheet = balance_sheet.groupby(level="ticker_id").tail(1)
+        latest_balance_sheet = latest_balance_sheet.droplevel("fiscal_date_ending")
+
+        equity = latest_balance_sheet[Statements.total_shareholder_equity]
+        equity = equity.where(equity != 0)
+        return pd.DataFrame(
+            {
+                "debt_to_equity": (
+                    latest_balance_sheet[Statements.short_term_debt]
+                    + latest_balance_sheet[Statements.total_long_term_debt]
+                )
+                / equity
+                * 100,
+                "assets_to_equity": latest_balance_sheet[Statements.total_assets]
+                / equity,
+            }
+        )
+
+    def returns_ratios(self, statements_df):
+        """
+        ROA and ROE ratios of the latest four quarters
+        """
+        ratios = {}
+        for statement in [
+            Statements.net_income,
+            Statements.total_assets,
+            Statements.total_shareholder_equity,
+        ]:
+            latest_statements = self.get_statement(statements_df, statement)
+            latest_statements = latest_statements.groupby("ticker_id").head(
+                self.quarter
+            )
+            values = latest_statements.groupby("ticker_id").value.agg(["sum", "mean"])
+            counts = latest_statements.groupby("ticker_id").size()
+            ratios[statement] = values[counts == self.quarter]
+
+        net_income = ratios[Statements.net_income]["sum"]
+        return pd.DataFrame(
+            {
+                "roa": net_income / ratios[Statements.total_assets]["mean"] * 100,
+                "roe": net_income
+                / ratios[Statements.total_shareholder_equity]["mean"]
+                * 100,
+            }
+        )
+
+    def shares_dilution(self, statements_df):
+        """
+        Outstanding shares change between the latest value and the value of one year ago
+        """
+        shares = self.get_statement(statements_df, Statements.outstanding_shares)
+        current_shares = shares.groupby("ticker_id").value.first()
+
+        last_year_shares = shares[
+            (shares.fiscal_date_ending <= self.today - pd.DateOffset(years=1))
+            & (shares.fiscal_date_ending >= self.today - pd.DateOffset(years=2))
+        ]
+        last_year_shares = last_year_shares.groupby("ticker_id").value.first()
+        return ((current_shares / last_year_shares - 1) * 100).rename("shares_dilution")
@@ -0,0 +1,135 @@
+"""
+Ticker fundamentals derived from the ticker statements
+"""
+from datetime import date
+
+from dateutil.relativedelta import relativedelta
+from django.core.cache import cache
+from django.db import models, transaction
+
+from fin.models.ticker.ticker import Ticker
+from fin.models.utils import TimeStampMixin, MAX_DIGITS, DECIMAL_PLACES
+
+
+class TickerFundamentals(TimeStampMixin):
+    """
+    Materialized ticker metrics, recalculated when new ticker statements are written
+    """
+
+    earnings_growth_cache_prefix = "annual_earnings_growth"
+    earnings_growth_cache_timeout = 60 * 60 * 24
+
+    ticker = models.OneToOneField(
+        Ticker, on_delete=models.CASCADE, related_name="fundamentals"
+    )
+    annual_earnings_growth = models.DecimalField(
+        max_digits=MAX_DIGITS, decimal_places=DECIMAL_PLACES, null=True
+    )
+    assets_to_equity = models.DecimalField(
+        max_digits=MAX_DIGITS, decimal_places=DECIMAL_PLACES, null=True
+    )
+    debt_to_equity = models.DecimalField(
+        max_digits=MAX_DIGITS, decimal_places=DECIMAL_PLACES, null=True
+    )
+    roa = models.DecimalField(
+        max_digits=MAX_DIGITS, decimal_places=DECIMAL_PLACES, null=True
+    )
+    roe = models.DecimalField(
+        max_digits=MAX_DIGITS, decimal_places=DECIMAL_PLACES, null=True
+    )
+    shares_dilution = models.DecimalField(
+        max_digits=MAX_DIGITS, decimal_places=DECIMAL_PLACES, null=True
+    )
+
+    class Meta:
+        """
+        Model meta class
+        """
+
+        verbose_name_plural = "Ticker fundamentals"
+
+    def __str__(self):
+        return str(self.ticker)
+
+    @property
+    def debt(self):
+        """
+        Debt ratios in the TickerSerializer format
+        """
+        return {
+            "debt_to_equity": self.debt_to_equity,
+            "assets_to_equity": self.assets_to_equity,
+        }
+
+    @property
+    def returns_ratios(self):
+        """
+        Returns ratios in the TickerSerializer format
+        """
+        if self.roa is None and self.roe is None:
+            return None
+        return {"roa": self.roa, "roe": self.roe}
+
+    @classmethod
+    def calculate(cls, tickers, today=None):
+        """
+        Calculates fundamentals of the given tickers with one statements query, returns the
+        mapping of the ticker id to the unsaved fundamentals
+        """
+        # pylint: disable=import-outside-toplevel
+        from fin.models.ticker.calculator import FundamentalsCalculator
+
+        ticker_ids = [getattr(ticker, "id", ticker) for ticker in tickers]
+        fundamentals_df = FundamentalsCalculator(today).calculate_for(ticker_ids)
+        return {
+            ticker_id: cls(ticker_id=ticker_id, **fundamentals)
+            for ticker_id, fundamentals in fundamentals_df.to_dict("index").items()
+        }
+
+    @classmethod
+    def refresh(cls, tickers, batch_size=500):
+        """
+        Recalculates fundamentals of the given tickers in batches, the rows of every batch are
+        replaced atomically, so readers never see the batch missing
+        """
+        ticker_ids = [getattr(ticker, "id", ticker) for ticker in tickers]
+        for i in range(0, len(ticker_ids), batch_size):
+            batch_ticker_ids = ticker_ids[i : i + batch_size]
+            fundamentals = cls.calculate(batch_ticker_ids)
+
+            with transaction.atomic():
+                cls.objects.filter(ticker_id__in=batch_ticker_ids).delete()
+                cls.objects.bulk_create(fundamentals.values())
+
+    @classmethod
+    def calculate_annual_earnings_growth(cls, ticker, today=None):
+        """
+        Calculates annual earnings growth from the net income series fetched with one query, the
+        result is memoized per the ticker, its latest fiscal date ending and the latest update of
+        the series, so restated values are not served from the memo
+        """
+        # pylint: disable=import-outside-toplevel
+        from fin.models.ticker.calculator import FundamentalsCalculator, earnings_growth
+
+        almost_six_years_ago = (today or date.today()) - relativedelta(
+            years=5, months=11
+        )
+        statements = list(
+            ticker.net_income_statements(almost_six_years_ago).values_list(
+                "fiscal_date_ending", "value", "updated"
+            )[: FundamentalsCalculator.max_net_income_statements]
+        )
+        if len(statements) < FundamentalsCalculator.quarter:
+            return None
+
+        latest_update = max(updated for _, _, updated in statements)
+        cache_key = (
+            f"{cls.earnings_growth_cache_prefix}:{ticker.id}:"
+            f"{statements[0][0].isoformat()}:{almost_six_years_ago.isoformat()}:"
+            f"{latest_update.timestamp()}"
+        )
+        if (result_value := cache.get(cache_key)) is None:
+            net_income = [float(value) for _, value, _ in reversed(statements)]
+            result_value = round(earnings_growth(net_income), 2)
+            cache.set(cache_key, result_value, cls.earnings_growth_cache_timeout)
+        return result_value
@@ -3,9 +3,9 @@ Ticker and hard related models
 """
 from datetime import date, timedelta
 
-from django.db import models
+from django.db import connection, models
 from django.db.models import Q
-from querybuilder.query import Query
+from django.utils import timezone
 
 from fin.models.stock_exchange import StockExchange
 from fin.models.utils import TimeStampMixin, MAX_DIGITS, DECIMAL_PLACES
@@ -21,31 +21,19 @@ class OutdatedTickersManager(models.Manager):
     def get_queryset(self):
         """
         Returns queryset which contains Ticker models without information about sector, industry,
-         country or outdated ticker statements
+         country or with outdated income statement, balance sheet or price, it is served by the
+         ticker table indices alone
         """
         queryset = super().get_queryset()
         quarter_ago = date.today() - timedelta(30 * 3)
-        return (
-            queryset.filter(
-                Q(sector=Ticker.DEFAULT_VALUE)
-                | Q(industry=Ticker.DEFAULT_VALUE)
-                | Q(country=Ticker.DEFAULT_VALUE)
-                | Q(pe=None)
-                | Q(
-                    ticker_statements__name=Statements.net_income.value,
-                    ticker_statements__fiscal_date_ending__lte=quarter_ago,
-                )
-                | Q(
-                    ticker_statements__name=Statements.total_assets.value,
-                    ticker_statements__fiscal_date_ending__lte=quarter_ago,
-                )
-                | Q(
-                    ticker_statements__name=Statements.price.value,
-                    ticker_statements__fiscal_date_ending__lte=quarter_ago,
-                )
-            )
-            .order_by("-ticker_statements__fiscal_date_ending")
-            .distinct()
+        return queryset.filter(
+            Q(sector=Ticker.DEFAULT_VALUE)
+            | Q(industry=Ticker.DEFAULT_VALUE)
+            | Q(country=Ticker.DEFAULT_VALUE)
+            | Q(pe=None)
+            | Q(income_statement_date__lte=quarter_ago)
+            | Q(balance_sheet_date__lte=quarter_ago)
+            | Q(price_date__lte=quarter_ago)
         )
 
 
@@ -64,6 +52,12 @@ class Ticker(TimeStampMixin):
     cusip = models.CharField(max_length=9, null=True)
     industry = models.CharField(max_length=50, default=DEFAULT_VALUE)
     isin = models.CharField(max_length=12, null=True)
+    overview_updated = models.DateTimeField(null=True)
+    income_statement_date = models.DateField(null=True)
+    balance_sheet_date = models.DateField(null=True)
+    price_date = models.DateField(null=True)
+    # the last time the scheduler tried to refresh the ticker, successful or not
+    refresh_attempted = models.DateTimeField(null=True)
     market_cap = models.DecimalField(
         max_digits=MAX_DIGITS, decimal_places=DECIMAL_PLACES, null=True
     )
@@ -118,38 +112,48 @@ class Ticker(TimeStampMixin):
                     "symbol",
                 ]
             ),
+            models.Index(
+                fields=[
+                    "pe",
+                ]
+            ),
+            models.Index(
+                fields=[
+                    "income_statement_date",
+                ]
+            ),
+            models.Index(
+                fields=[
+                    "balance_sheet_date",
+                ]
+            ),
+            models.Index(
+                fields=[
+                    "price_date",
+                ]
+            ),
         ]
 
     def __str__(self):
         return f"{self.symbol}.{self.stock_exchange}"
 
-    def get_debt_statements(self, statement, value_alias):
+    def track_statements_dates(self, statements):
         """
-        Returns ticker statements related to calculating debt to equity and assets to equity
+        Moves the latest fiscal dates of the income statement, the balance sheet and the price
+        forward by the new statements
         """
-        return (
-            Query()
-            .from_table(
-                TickerStatement,
-                [
-                    TickerStatement.fiscal_date_ending.field.name,
-                    {value_alias: TickerStatement.value.field.name},
-                ],
-            )
-            .where(ticker_id=self.id, name=statement)
-            .group_by(TickerStatement.fiscal_date_ending.field.name)
-            .group_by(TickerStatement.value.field.name)
-            .order_by(TickerStatement.fiscal_date_ending.field.name, desc=True)
-        )
-
-    def get_returns_statements(self, statement):
-        """
-        Returns ticker statements related to calculating ROA and ROE
-        """
-        quarter = 4
-        return self.ticker_statements.filter(name=statement).order_by(
-            f"-{TickerStatement.fiscal_date_ending.field.name}"
-        )[:quarter]
+        fields = {
+            Statements.net_income: "income_statement_date",
+            Statements.total_assets: "balance_sheet_date",
+            Statements.price: "price_date",
+        }
+        for statement in statements:
+            field = fields.get(statement.name)
+            if field is None:
+                continue
+            latest_date = getattr(self, field)
+            if latest_date is None or statement.fiscal_date_ending > latest_date:
+                setattr(self, field, statement.fiscal_date_ending)
 
     def net_income_statements(self, start_date):
         """
@@ -197,16 +201,112 @@ class Statements(models.TextChoices):
     total_shareholder_equity = "total_shareholder_equity"
 
 
+class TickerStatementManager(models.Manager):
+    """
+    Writes ticker statements in bulk by the (ticker, name, fiscal_date_ending) key
+    """
+
+    upsert_fields = [
+        "created",
+        "updated",
+        "name",
+        "fiscal_date_ending",
+        "value",
+        "ticker",
+    ]
+
+    def upsert(self, statements):
+        """
+        Inserts new statements, updates the values of the existing ones that differ and skips
+        the unchanged ones without reading them first. Returns inserted, updated and unchanged
+        counts, the statements repeated by the key are counted once with the last value
+        """
+        statements = list(
+            {
+                (statement.ticker_id, statement.name, statement.fiscal_date_ending): (
+                    statement
+                )
+                for statement in statements
+            }.values()
+        )
+        counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+        if not statements:
+            return counts
+
+        now = timezone.now()
+        for statement in statements:
+            statement.created = statement.updated = now
+
+        fields = [self.model._meta.get_field(name) for name in self.upsert_fields]
+        batch_size = connection.ops.bulk_batch_size(fields, statements)
+        for start in range(0, len(statements), batch_size):
+            batch = statements[start : start + batch_size]
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    self.get_upsert_sql(fields, len(batch)),
+                    self.get_params(fields, batch),
+                )
+                returned = [row[0] for row in cursor.fetchall()]
+
+            inserted = sum(1 for is_inserted in returned if is_inserted)
+            counts["inserted"] += inserted
+            counts["updated"] += len(returned) - inserted
+            counts["unchanged"] += len(batch) - len(returned)
+        return counts
+
+    def get_upsert_sql(self, fields, rows_count):
+        """
+        Returns INSERT ON CONFLICT statement that updates only the changed values and returns
+        whether every written row is inserted, the inserted rows keep the same creation and
+        update time. It is supported by PostgreSQL and SQLite
+        """
+        quote_name = connection.ops.quote_name
+        table = quote_name(self.model._meta.db_table)
+        columns = ", ".join(quote_name(field.column) for field in fields)
+        row = f"({', '.join(['%s'] * len(fields))})"
+        key = ", ".join(
+            quote_name(self.model._meta.get_field(name).column)
+            for name in ["ticker", "name", "fiscal_date_ending"]
+        )
+        value = quote_name("value")
+        updated = quote_name("updated")
+        return (
+            f"INSERT INTO {table} ({columns}) VALUES {', '.join([row] * rows_count)} "
+            f"ON CONFLICT ({key}) DO UPDATE "
+            f"SET {value} = EXCLUDED.{value}, {updated} = EXCLUDED.{updated} "
+            f"WHERE {table}.{value} <> EXCLUDED.{value} "
+            f"RETURNING {table}.{quote_name('created')} = {table}.{updated}"
+        )
+
+    @staticmethod
+    def get_params(fields, statements):
+        """
+        Returns the database values of the statements fields
+        """
+        return [
+            field.get_db_prep_save(getattr(statement, field.attname), connection)
+            for statement in statements
+            for field in fields
+        ]
+
+
 class TickerStatement(TimeStampMixin):
     """
     Model that represents ticker financial statements
     """
 
+    objects = TickerStatementManager()
+
     name = models.CharField(choices=Statements.choices, max_length=50)
     fiscal_date_ending = models.DateField()
     value = models.DecimalField(max_digits=MAX_DIGITS, decimal_places=DECIMAL_PLACES)
+    # the ticker_id lookups are served by the ticker_statement_unique index prefix
     ticker = models.ForeignKey(
-        Ticker, on_delete=models.CASCADE, null=False, related_name="ticker_statements"
+        Ticker,
+        on_delete=models.CASCADE,
+        null=False,
+        related_name="ticker_statements",
+        db_index=False,
     )
 
     class Meta:
@@ -214,4 +314,11 @@ class TickerStatement(TimeStampMixin):
         Meta
         """
 
-        unique_together = ["fiscal_date_ending", "name", "ticker_id"]
+        constraints = [
+            # the statements are read by ticker and name ordered by the fiscal date ending,
+            # the descending order is served by the backward index scan
+            models.UniqueConstraint(
+                fields=["ticker", "name", "fiscal_date_ending"],
+                name="ticker_statement_unique",
+            )
+        ]
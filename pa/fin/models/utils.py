@@ -34,3 +34,4 @@ class UpdatingStatus(models.IntegerChoices):
     successfully_updated = 0, _("Successfully Updated")
     updating = 1, _("Updating")
     update_failed = 2, _("Update Failed")
+    partially_updated = 3, _("Partially Updated")
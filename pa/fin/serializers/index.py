@@ -31,8 +31,24 @@ class BaseIndexSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Index
-        fields = ("id", "source", "name", "status", "tickers_last_updated", "updated")
-        read_only_fields = ("id", "name", "status", "updated")
+        fields = (
+            "id",
+            "source",
+            "name",
+            "status",
+            "reload_status",
+            "reload_timings",
+            "tickers_last_updated",
+            "updated",
+        )
+        read_only_fields = (
+            "id",
+            "name",
+            "status",
+            "reload_status",
+            "reload_timings",
+            "updated",
+        )
 
 
 # pylint: disable=no-self-use
@@ -47,6 +63,7 @@ class IndexSerializer(BaseIndexSerializer):
         view_name="sources-list",
     )
     status = SerializerMethodField(read_only=True)
+    reload_status = SerializerMethodField(read_only=True)
 
     def get_status(self, obj):
         """
@@ -54,6 +71,12 @@ class IndexSerializer(BaseIndexSerializer):
         """
         return UpdatingStatus(obj.status).label
 
+    def get_reload_status(self, obj):
+        """
+        Returns Updating Status of the index reload
+        """
+        return UpdatingStatus(obj.reload_status).label
+
     class Meta:
         """
         Serializer meta class
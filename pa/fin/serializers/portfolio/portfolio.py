@@ -172,6 +172,7 @@ class DetailedPortfolioSerializer(PortfolioSerializer):
 
         portfolio_tickers = (
             PortfolioTicker.objects.filter(portfolio=obj)
+            .select_related("ticker__fundamentals", "ticker__stock_exchange")
             .annotate(cost=cost)
             .order_by("-cost")
         )
@@ -1,4 +1,8 @@
 """
 Module for tasks
 """
+from . import queues  # pylint: disable=unused-import
 from .update_tickers_statements import update_tickers_statements_task
+from .update_tickers_fundamentals import update_tickers_fundamentals_task
+from .schedule_tickers_updates import schedule_tickers_updates_task
+from .reload_index import reload_index_task
@@ -0,0 +1,66 @@
+"""
+Celery queues of the tickers updates and their metrics
+"""
+import time
+
+from celery.signals import before_task_publish, task_prerun
+
+from fin.external_api.alpha_vantage.limiter import Priorities
+from pa.celery import redis_client as r
+
+QUEUES = [Priorities.interactive, Priorities.background]
+ENQUEUED_AT_HEADER = "enqueued_at"
+METRICS_KEY = "celery_queues:metrics"
+
+
+# pylint: disable=unused-argument
+@before_task_publish.connect
+def mark_enqueued_at(headers=None, **kwargs):
+    """
+    Stores the publishing time in the task message headers
+    """
+    if headers is not None:
+        headers[ENQUEUED_AT_HEADER] = time.time()
+
+
+@task_prerun.connect
+def record_queue_wait(task=None, **kwargs):
+    """
+    Records the time the task waited in the queue
+    """
+    enqueued_at = getattr(task.request, ENQUEUED_AT_HEADER, None)
+    delivery_info = task.request.delivery_info or {}
+    queue = delivery_info.get("routing_key")
+    if enqueued_at is None or queue is None:
+        return
+
+    wait_time = max(time.time() - enqueued_at, 0.0)
+    pipeline = r.pipeline()
+    pipeline.hincrby(METRICS_KEY, f"{queue}_tasks", 1)
+    pipeline.hincrbyfloat(METRICS_KEY, f"{queue}_wait_seconds", wait_time)
+    pipeline.hset(METRICS_KEY, f"{queue}_last_wait_seconds", wait_time)
+    pipeline.execute()
+
+
+# pylint: enable=unused-argument
+
+
+def get_queues_metrics():
+    """
+    Returns the number of waiting tasks, the number of started tasks and their wait times per
+    queue
+    """
+    metrics = {
+        key.decode(): float(value) for key, value in r.hgetall(METRICS_KEY).items()
+    }
+    result = {}
+    for queue in QUEUES:
+        tasks = int(metrics.get(f"{queue}_tasks", 0))
+        wait_seconds = metrics.get(f"{queue}_wait_seconds", 0.0)
+        result[queue] = {
+            "depth": r.llen(queue),
+            "tasks": tasks,
+            "average_wait_seconds": wait_seconds / tasks if tasks else 0.0,
+            "last_wait_seconds": metrics.get(f"{queue}_last_wait_seconds", 0.0),
+        }
+    return result
@@ -0,0 +1,105 @@
+"""
+The pipeline that reloads index tickers from the index source
+"""
+import logging
+from time import perf_counter
+
+from redis.exceptions import LockError
+
+from fin.external_api.alpha_vantage.limiter import Priorities
+from fin.models.index import Index
+from fin.models.index.parsers import get_content_hash
+from fin.models.utils import UpdatingStatus
+from fin.tasks.update_tickers_statements import (
+    LOCKED,
+    update_model_tickers_statements_task,
+)
+from pa import celery_app
+from pa.celery import redis_client as r
+
+logger = logging.getLogger(__name__)
+RELOAD_LOCK_TIMEOUT = 60 * 60
+UNCHANGED = "Unchanged"
+
+
+class StagesTimer:
+    """
+    Measures durations of the pipeline stages and stores them on the index after every stage
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.timings = {}
+
+    def run(self, stage, function, *args):
+        """
+        Runs the stage function and returns its result
+        """
+        start_time = perf_counter()
+        result = function(*args)
+        self.timings[stage] = round(perf_counter() - start_time, 3)
+        Index.objects.filter(pk=self.index.pk).update(reload_timings=self.timings)
+        return result
+
+
+def reload_index(index):
+    """
+    Reloads index tickers by the download, parse, resolve and reconcile stages, the status and
+    the stages durations are stored on the index. Returns the index tickers churn or None when
+    the source raw data did not change since the published version, the other stages are
+    skipped then
+    """
+    Index.objects.filter(pk=index.pk).update(
+        reload_status=UpdatingStatus.updating, reload_timings={}
+    )
+    timer = StagesTimer(index)
+    try:
+        parser = index.source.parser
+        content_hash = get_content_hash(timer.run("download", parser.load))
+        if content_hash == index.content_hash:
+            churn = None
+        else:
+            parsed_index_tickers = timer.run("parse", parser.parse)
+            tickers = timer.run("resolve", index.resolve_tickers, parsed_index_tickers)
+            churn = timer.run(
+                "reconcile", index.reconcile, parsed_index_tickers, tickers
+            )
+            Index.objects.filter(pk=index.pk).update(content_hash=content_hash)
+            index.content_hash = content_hash
+    except Exception:
+        Index.objects.filter(pk=index.pk).update(
+            reload_status=UpdatingStatus.update_failed
+        )
+        raise
+    Index.objects.filter(pk=index.pk).update(
+        reload_status=UpdatingStatus.successfully_updated
+    )
+    return churn
+
+
+@celery_app.task()
+def reload_index_task(index_id):
+    """
+    Reloads index tickers in the background and updates statements of its tickers after that,
+    nothing is updated when the index source did not change
+    """
+    try:
+        lock = r.lock(f"reload_index_task_{index_id}", timeout=RELOAD_LOCK_TIMEOUT)
+        if lock.acquire(blocking=False):
+            try:
+                index = Index.objects.select_related("source").get(pk=index_id)
+                if not index.source.updatable:
+                    return False
+                churn = reload_index(index)
+            finally:
+                lock.release()
+            if churn is None:
+                return UNCHANGED
+            update_model_tickers_statements_task.apply_async(
+                (Index.__name__, index_id, Priorities.background),
+                queue=Priorities.background,
+            )
+            return churn
+        return LOCKED
+    except LockError:
+        return LOCKED
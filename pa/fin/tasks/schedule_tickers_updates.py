@@ -0,0 +1,214 @@
+"""
+Scheduler that spreads the tickers updates over time by the tickers priorities
+"""
+import heapq
+import logging
+from datetime import timedelta
+
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.db.models import DecimalField, ExpressionWrapper, F, Q, Sum
+from django.utils import timezone
+from redis.exceptions import LockError
+
+from fin.external_api.alpha_vantage.fetcher import TickersFetcher
+from fin.external_api.alpha_vantage.limiter import Priorities
+from fin.models.index import IndexTicker
+from fin.models.portfolio import PortfolioTicker
+from fin.models.ticker import Ticker
+from fin.tasks.update_tickers_statements import LOCKED, update_tickers_statements
+from pa import celery_app
+from pa.celery import redis_client as r
+
+logger = logging.getLogger(__name__)
+
+
+class TickersUpdateScheduler:
+    """
+    Scores tickers by the portfolios exposure, the indices weights, the staleness and the
+    expected earnings reports, and picks the most valuable tickers that fit the API quota of one
+    scheduler run
+    """
+
+    base_importance = 1
+    exposure_importance = 1000
+    index_weight_importance = 100
+    missing_information_urgency = 1
+    expected_report_urgency = 1
+    # quarterly reports are published within about 45 days after the fiscal date ending
+    report_delay = timedelta(days=45)
+
+    def __init__(self, now=None):
+        self.now = now or timezone.now()
+
+    @staticmethod
+    def get_exposures():
+        """
+        Returns the mapping of the ticker id to its share of the total portfolios cost
+        """
+        exposures = dict(
+            PortfolioTicker.objects.values("ticker_id")
+            .annotate(
+                exposure=Sum(
+                    ExpressionWrapper(
+                        F("amount") * F("ticker__price"),
+                        output_field=DecimalField(),
+                    )
+                )
+            )
+            .values_list("ticker_id", "exposure")
+        )
+        total_exposure = sum(exposures.values())
+        if not total_exposure:
+            return {}
+        return {
+            ticker_id: float(exposure / total_exposure)
+            for ticker_id, exposure in exposures.items()
+        }
+
+    @staticmethod
+    def get_index_weights():
+        """
+        Returns the mapping of the ticker id to its average weight across all indices
+        """
+        index_weights = dict(
+            IndexTicker.objects.current()
+            .values("ticker_id")
+            .annotate(weight=Sum("weight"))
+            .values_list("ticker_id", "weight")
+        )
+        indices_count = (
+            IndexTicker.objects.current().values("index_id").distinct().count()
+        )
+        return {
+            ticker_id: float(weight) / indices_count
+            for ticker_id, weight in index_weights.items()
+        }
+
+    def get_scores(self):
+        """
+        Returns the mapping of the ticker id to its priority, importance of the ticker multiplied
+        by the urgency of its update
+        """
+        exposures = self.get_exposures()
+        index_weights = self.get_index_weights()
+        # the latest report and the overview freshness are read from the ticker table, the
+        # statements are not joined
+        tickers = Ticker.objects.values_list(
+            "id",
+            "updated",
+            "income_statement_date",
+            "overview_updated",
+            "sector",
+            "industry",
+            "country",
+            "pe",
+        )
+
+        scores = {}
+        for (
+            ticker_id,
+            updated,
+            latest_report,
+            overview_updated,
+            *information,
+        ) in tickers:
+            importance = (
+                self.base_importance
+                + self.exposure_importance * exposures.get(ticker_id, 0)
+                + self.index_weight_importance * index_weights.get(ticker_id, 0)
+            )
+
+            staleness = self.now - updated
+            urgency = staleness / timedelta(days=settings.TICKERS_FRESHNESS_DAYS)
+            if (
+                overview_updated is None
+                or Ticker.DEFAULT_VALUE in information
+                or None in information
+            ):
+                urgency += self.missing_information_urgency
+            if latest_report is not None:
+                expected_report = (
+                    latest_report + relativedelta(months=3) + self.report_delay
+                )
+                if updated.date() < expected_report <= self.now.date():
+                    urgency += self.expected_report_urgency
+            scores[ticker_id] = importance * urgency
+        return scores
+
+    @staticmethod
+    def get_run_budget():
+        """
+        Returns the number of tickers one scheduler run can update within the background share of
+        the daily API quota
+        """
+        runs_per_day = timedelta(days=1) / timedelta(
+            minutes=settings.TICKERS_UPDATE_SCHEDULE_MINUTES
+        )
+        background_calls = settings.ALPHAVANTAGE_CALLS_PER_DAY * (
+            1 - settings.ALPHAVANTAGE_INTERACTIVE_RESERVE
+        )
+        return max(
+            int(background_calls / runs_per_day / len(TickersFetcher.functions)), 1
+        )
+
+    def pick(self, budget=None):
+        """
+        Returns ids of the most valuable tickers to update during the run, tickers updated or
+        attempted to refresh within the minimal update interval are skipped
+        """
+        budget = budget or self.get_run_budget()
+        min_update_time = self.now - timedelta(
+            hours=settings.TICKERS_MIN_UPDATE_INTERVAL_HOURS
+        )
+        recently_updated = set(
+            Ticker.objects.filter(
+                Q(updated__gt=min_update_time)
+                | Q(refresh_attempted__gt=min_update_time)
+            ).values_list("id", flat=True)
+        )
+        scores = self.get_scores()
+        return heapq.nlargest(
+            budget,
+            (ticker_id for ticker_id in scores if ticker_id not in recently_updated),
+            key=scores.get,
+        )
+
+
+@celery_app.task()
+def schedule_tickers_updates_task():
+    """
+    Updates the most valuable tickers in the background, runs on every scheduler tick. The
+    refresh attempt of the picked tickers is recorded before the update, so the tickers that
+    fail to update do not take the quota of every next run while their updated time still shows
+    the last successful refresh
+    """
+    try:
+        lock = r.lock(
+            "schedule_tickers_updates_task",
+            timeout=settings.TICKERS_UPDATE_SCHEDULE_MINUTES * 60 * 2,
+        )
+        if lock.acquire(blocking=False):
+            try:
+                ticker_ids = TickersUpdateScheduler().pick()
+                Ticker.objects.filter(id__in=ticker_ids).update(
+                    refresh_attempted=timezone.now()
+                )
+                # pylint: disable=broad-except
+                try:
+                    update_tickers_statements(
+                        Ticker.objects.filter(id__in=ticker_ids),
+                        priority=Priorities.background,
+                        on_error=lambda ticker, error: logger.error(
+                            "Ticker %s failed to update: %r", ticker.id, error
+                        ),
+                    )
+                except Exception as error:
+                    logger.exception(error)
+                # pylint: enable=broad-except
+            finally:
+                lock.release()
+            return ticker_ids
+        return LOCKED
+    except LockError:
+        return LOCKED
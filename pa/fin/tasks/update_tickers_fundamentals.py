@@ -0,0 +1,14 @@
+"""
+The function that recalculates materialized tickers fundamentals
+"""
+from fin.models.ticker import Ticker, TickerFundamentals
+from pa import celery_app
+
+
+@celery_app.task()
+def update_tickers_fundamentals_task():
+    """
+    Recalculates fundamentals of all tickers in batches
+    """
+    TickerFundamentals.refresh(list(Ticker.objects.values_list("id", flat=True)))
+    return True
@@ -3,89 +3,219 @@ The function that fetch information about ticker statements
 """
 import logging
 from datetime import date
+from decimal import Decimal
 
+from celery import chord
+from celery.utils.time import get_exponential_backoff_interval
+from django.utils import timezone
 from redis.exceptions import LockError
 
 from fin.external_api.alpha_vantage import AlphaVantage, AVFunctions
+from fin.external_api.alpha_vantage.fetcher import TickersFetcher
+from fin.external_api.alpha_vantage.limiter import Priorities
 from fin.external_api.alpha_vantage.parsers import (
     parse_time_series_monthly,
     parse_balance_sheet,
     parse_income_statement,
 )
+from fin.external_api.alpha_vantage.single_flight import (
+    RefreshStates,
+    TickerRefreshFlight,
+)
 from fin.models.index import Index
 from fin.models.portfolio import Portfolio
-from fin.models.ticker import Ticker, TickerStatement, Statements
+from fin.models.ticker import (
+    Ticker,
+    TickerFundamentals,
+    TickerStatement,
+    Statements,
+)
 from fin.models.utils import UpdatingStatus
 from pa import celery_app
 from pa.celery import redis_client as r
 
 logger = logging.getLogger(__name__)
 LOCKED = "Locked"
+MODEL_TYPES = {"Index": Index, "Portfolio": Portfolio}
+MODEL_UPDATE_LOCK_TIMEOUT = 60 * 60 * 24
+TICKER_UPDATE_MAX_RETRIES = 3
+TICKER_UPDATE_RETRY_BACKOFF = 60
+TICKER_UPDATE_RETRY_BACKOFF_MAX = 60 * 30
+TICKERS_WRITE_BATCH_SIZE = 50
+TICKERS_BATCH_FIELDS = [
+    "country",
+    "industry",
+    "sector",
+    "pe",
+    "price",
+    "overview_updated",
+    "income_statement_date",
+    "balance_sheet_date",
+    "price_date",
+    "updated",
+]
 
 
-def update_tickers_statements(tickers_query):
+def parse_ticker_responses(ticker, responses, outstanding_shares):
     """
-    The function gets tickers with the unknown sector, industry or country, or with outdated
-    financial statements and trying to fetch this information from Alpha Vantage API
+    Sets the overview fields and the latest price of the ticker from AV API responses and
+    returns its parsed statements, outstanding_shares is the latest stored outstanding shares
+    of the ticker or None
     """
+    tickers_statements = []
 
-    av_api = AlphaVantage()
-    for ticker in tickers_query:
-        tickers_statements = []
-
-        ticker_overview = av_api.call(AVFunctions.overview.value, ticker.symbol)
-        ticker.country = ticker_overview.get("Country", Ticker.DEFAULT_VALUE)
-        ticker.industry = ticker_overview.get("Industry", Ticker.DEFAULT_VALUE)
-        ticker.sector = ticker_overview.get("Sector", Ticker.DEFAULT_VALUE)
+    ticker_overview = responses[AVFunctions.overview]
+    ticker.country = ticker_overview.get("Country", Ticker.DEFAULT_VALUE)
+    ticker.industry = ticker_overview.get("Industry", Ticker.DEFAULT_VALUE)
+    ticker.sector = ticker_overview.get("Sector", Ticker.DEFAULT_VALUE)
 
-        pe_ratio = ticker_overview.get("PERatio")
-        ticker.pe = None if pe_ratio == "None" else pe_ratio
+    pe_ratio = ticker_overview.get("PERatio")
+    ticker.pe = None if pe_ratio == "None" else pe_ratio
+    ticker.overview_updated = timezone.now()
 
-        outstanding_shares = (
-            TickerStatement.objects.filter(
-                name=Statements.outstanding_shares, ticker=ticker
+    shares_outstanding = ticker_overview.get("SharesOutstanding")
+    if shares_outstanding not in (None, "None") and outstanding_shares != Decimal(
+        shares_outstanding
+    ):
+        tickers_statements.append(
+            TickerStatement(
+                name=Statements.outstanding_shares,
+                fiscal_date_ending=date.today(),
+                value=shares_outstanding,
+                ticker=ticker,
             )
-            .order_by("-fiscal_date_ending")
-            .first()
         )
-        if not outstanding_shares or outstanding_shares.value != ticker_overview.get(
-            "SharesOutstanding"
+
+    tickers_statements += parse_income_statement(
+        ticker, responses[AVFunctions.income_statement]
+    )
+    tickers_statements += parse_balance_sheet(
+        ticker, responses[AVFunctions.balance_sheet]
+    )
+    prices = parse_time_series_monthly(
+        ticker, responses[AVFunctions.time_series_monthly_adjusted]
+    )
+    tickers_statements += prices
+
+    if prices:
+        latest_price = max(prices, key=lambda price: price.fiscal_date_ending)
+        if ticker.price_date is None or (
+            latest_price.fiscal_date_ending >= ticker.price_date
         ):
-            tickers_statements.append(
-                TickerStatement(
-                    name=Statements.outstanding_shares,
-                    fiscal_date_ending=date.today(),
-                    value=ticker_overview.get("SharesOutstanding"),
-                    ticker=ticker,
-                )
-            )
+            ticker.price = latest_price.value or ticker.price
+    ticker.track_statements_dates(tickers_statements)
+    return tickers_statements
 
-        ticker_income_statement = av_api.call(
-            AVFunctions.income_statement.value, ticker.symbol
-        )
-        tickers_statements += parse_income_statement(ticker, ticker_income_statement)
 
-        ticker_balance_sheet = av_api.call(
-            AVFunctions.balance_sheet.value, ticker.symbol
+def update_tickers_batch(tickers_responses):
+    """
+    Parses AV API responses of the batch of tickers and writes them with a few queries for the
+    whole batch: the latest outstanding shares are read at once, the statements are upserted,
+    the tickers fields are written with bulk update and the fundamentals are recalculated
+    together. Returns inserted, updated and unchanged statements counts
+    """
+    tickers = [ticker for ticker, _ in tickers_responses]
+    outstanding_shares = {}
+    for ticker_id, value in (
+        TickerStatement.objects.filter(
+            name=Statements.outstanding_shares,
+            ticker_id__in=[ticker.id for ticker in tickers],
         )
-        tickers_statements += parse_balance_sheet(ticker, ticker_balance_sheet)
+        .order_by("ticker_id", "-fiscal_date_ending")
+        .values_list("ticker_id", "value")
+    ):
+        outstanding_shares.setdefault(ticker_id, value)
 
-        ticker_time_series_monthly = av_api.call(
-            AVFunctions.time_series_monthly_adjusted.value, ticker.symbol
-        )
-        tickers_statements += parse_time_series_monthly(
-            ticker, ticker_time_series_monthly
+    tickers_statements = []
+    for ticker, responses in tickers_responses:
+        tickers_statements += parse_ticker_responses(
+            ticker, responses, outstanding_shares.get(ticker.id)
         )
 
-        if tickers_statements:
-            TickerStatement.objects.bulk_create(tickers_statements)
-        ticker_price = (
-            ticker.ticker_statements.filter(name="price")
-            .order_by("-fiscal_date_ending")
-            .first()
+    counts = TickerStatement.objects.upsert(tickers_statements)
+    now = timezone.now()
+    for ticker in tickers:
+        # bulk_update does not set auto_now fields
+        ticker.updated = now
+    Ticker.objects.bulk_update(tickers, TICKERS_BATCH_FIELDS)
+    if counts["inserted"] or counts["updated"]:
+        TickerFundamentals.refresh(tickers)
+    return counts
+
+
+def update_tickers_statements(
+    tickers_query,
+    fetcher=None,
+    priority=Priorities.interactive,
+    batch_size=None,
+    on_error=None,
+):
+    """
+    The function gets tickers with the unknown sector, industry or country, or with outdated
+    financial statements and trying to fetch this information from Alpha Vantage API. Responses
+    are fetched concurrently within the API quota while the current thread parses them and
+    writes to the database in batches of tickers. Tickers that are being refreshed by another
+    worker are not fetched again, their refreshed values are reloaded from the database. While
+    the fetching waits for another worker, the pending batch is written, so the other worker
+    never waits for the unwritten tickers of this one.
+    Background priority yields the API quota to interactive updates. With on_error a ticker
+    that fails to fetch is passed to it with the exception and the other tickers are updated.
+    Returns the total statements counts
+    """
+    if fetcher is None:
+        fetcher = TickersFetcher(
+            AlphaVantage(priority=priority), flight=TickerRefreshFlight(r)
         )
-        ticker.price = ticker_price.value or ticker.price
-        ticker.save()
+    flight = fetcher.flight
+    batch_size = batch_size or TICKERS_WRITE_BATCH_SIZE
+
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+
+    def write_batch(batch):
+        if flight is not None:
+            for ticker, _ in batch:
+                flight.update(ticker.id, RefreshStates.writing)
+        batch_counts = update_tickers_batch(batch)
+        if flight is not None:
+            for ticker, _ in batch:
+                flight.finish(ticker.id)
+        for key, count in batch_counts.items():
+            counts[key] += count
+
+    batch = []
+
+    def write_waited_batch():
+        nonlocal batch
+        if batch and flight.is_waiting():
+            write_batch(batch)
+            batch = []
+
+    def finish_failed(ticker, error):
+        if flight is not None:
+            flight.finish(ticker.id, RefreshStates.failed)
+        on_error(ticker, error)
+
+    responses_iterator = fetcher.iterate(
+        tickers_query,
+        on_idle=None if flight is None else write_waited_batch,
+        on_error=None if on_error is None else finish_failed,
+    )
+    try:
+        for ticker, responses in responses_iterator:
+            if responses is None:
+                ticker.refresh_from_db()
+                continue
+            batch.append((ticker, responses))
+            if len(batch) >= batch_size:
+                write_batch(batch)
+                batch = []
+        if batch:
+            write_batch(batch)
+    finally:
+        responses_iterator.close()
+        if flight is not None:
+            flight.finish_all(RefreshStates.failed)
+    return counts
 
 
 @celery_app.task()
@@ -96,7 +226,9 @@ def update_tickers_statements_task():
     try:
         lock = r.lock("update_tickers_statements_task")
         if lock.acquire(blocking=False):
-            update_tickers_statements(Ticker.outdated_tickers.all())
+            update_tickers_statements(
+                Ticker.outdated_tickers.all(), priority=Priorities.background
+            )
             lock.release()
             return True
         return LOCKED
@@ -104,36 +236,128 @@ def update_tickers_statements_task():
         return LOCKED
 
 
+def get_model_task_lock_name(obj_type, obj_id):
+    """
+    Returns the name of the lock held while the tickers of the object are updated
+    """
+    return f"update_{obj_type}_{obj_id}_tickers_statements_task"
+
+
+@celery_app.task(bind=True, max_retries=TICKER_UPDATE_MAX_RETRIES)
+def update_tickers_batch_statements_task(
+    self, ticker_ids, priority=Priorities.interactive, results=None
+):
+    """
+    Updates statements of the batch of tickers with the API priority, the failed tickers are
+    retried with the exponential backoff. Failures are reported in the results instead of
+    raising, so the chord callback always runs. Returns the results of every ticker
+    """
+    results = list(results or [])
+    errors = {}
+
+    def record_error(ticker, error):
+        errors[ticker.id] = error
+
+    # pylint: disable=broad-except
+    try:
+        update_tickers_statements(
+            Ticker.objects.filter(id__in=ticker_ids),
+            priority=priority,
+            on_error=record_error,
+        )
+    except Exception as error:
+        errors = {ticker_id: error for ticker_id in ticker_ids}
+    # pylint: enable=broad-except
+
+    results.extend(
+        {"ticker_id": ticker_id, "updated": True}
+        for ticker_id in ticker_ids
+        if ticker_id not in errors
+    )
+    if errors and self.request.retries < self.max_retries:
+        raise self.retry(
+            args=(list(errors), priority, results),
+            countdown=get_exponential_backoff_interval(
+                TICKER_UPDATE_RETRY_BACKOFF,
+                self.request.retries,
+                TICKER_UPDATE_RETRY_BACKOFF_MAX,
+                full_jitter=True,
+            ),
+        )
+    for ticker_id, error in errors.items():
+        logger.error("Ticker %s failed to update: %r", ticker_id, error)
+        results.append({"ticker_id": ticker_id, "updated": False, "error": repr(error)})
+    return results
+
+
+@celery_app.task()
+def finish_model_tickers_statements_task(batches_results, obj_type, obj_id):
+    """
+    Chord callback that sets the updating status of the object by the tickers results of all
+    batches and releases the object lock
+    """
+    model = MODEL_TYPES[obj_type]
+    results = [result for batch_results in batches_results for result in batch_results]
+    failed_ticker_ids = [
+        result["ticker_id"] for result in results if not result["updated"]
+    ]
+
+    if not failed_ticker_ids:
+        status = UpdatingStatus.successfully_updated
+    elif len(failed_ticker_ids) == len(results):
+        status = UpdatingStatus.update_failed
+    else:
+        status = UpdatingStatus.partially_updated
+    model.objects.filter(pk=obj_id).update(status=status)
+    r.delete(get_model_task_lock_name(obj_type, obj_id))
+
+    if failed_ticker_ids:
+        logger.warning(
+            "%s %s: %s of %s tickers failed to update: %s",
+            obj_type,
+            obj_id,
+            len(failed_ticker_ids),
+            len(results),
+            failed_ticker_ids,
+        )
+    return {
+        "updated": len(results) - len(failed_ticker_ids),
+        "failed": failed_ticker_ids,
+    }
+
+
 @celery_app.task()
-def update_model_tickers_statements_task(obj_type, obj_id):
+def update_model_tickers_statements_task(
+    obj_type, obj_id, priority=Priorities.interactive
+):
     """
-    Updating tickers statements for given object type with given id
+    Updating tickers statements for given object type with given id, tickers are updated by
+    subtasks in batches of TICKERS_WRITE_BATCH_SIZE and the chord callback sets the object
+    status. The subtasks are sent to the queue of the priority and call the API with it, so the
+    bulk updates do not take the interactive workers
     """
-    obj_types = {"Index": Index, "Portfolio": Portfolio}
-    model = obj_types[obj_type]
+    model = MODEL_TYPES[obj_type]
     try:
-        task_id = f"update_{obj_type}_{obj_id}_tickers_statements_task"
-        lock = r.lock(task_id)
+        lock = r.lock(
+            get_model_task_lock_name(obj_type, obj_id),
+            timeout=MODEL_UPDATE_LOCK_TIMEOUT,
+        )
         if lock.acquire(blocking=False):
             obj = model.objects.get(pk=obj_id)
             obj.status = UpdatingStatus.updating
             obj.save()
 
-            # pylint: disable=broad-except
-            try:
-                update_tickers_statements(obj.tickers.all())
-            except Exception as error:
-                logger.exception(error)
-                logger.exception(obj_type, obj_id)
-                obj.status = UpdatingStatus.update_failed
-                obj.save()
-                lock.release()
-                return False
-            # pylint: enable=broad-except
-
-            obj.status = UpdatingStatus.successfully_updated
-            obj.save()
-            lock.release()
+            ticker_ids = list(obj.tickers.order_by("id").values_list("id", flat=True))
+            callback = finish_model_tickers_statements_task.s(obj_type, obj_id)
+            if not ticker_ids:
+                callback.delay([])
+                return True
+            chord(
+                update_tickers_batch_statements_task.s(
+                    ticker_ids[i : i + TICKERS_WRITE_BATCH_SIZE], priority
+                ).set(queue=priority)
+                for i in range(0, len(ticker_ids), TICKERS_WRITE_BATCH_SIZE)
+            )(callback.set(queue=priority))
             return True
         return LOCKED
     except LockError:
@@ -1,17 +1,19 @@
 """
 Tests
 """
+from decimal import Decimal
 from random import choice
-from time import sleep
+from unittest.mock import Mock, patch
 
 from django.urls import reverse
-from rest_framework.status import HTTP_200_OK
+from rest_framework.status import HTTP_200_OK, HTTP_201_CREATED
 
-from fin.models.index import Index, Source
-from fin.tasks.update_tickers_statements import (
-    update_model_tickers_statements_task,
-    LOCKED,
-)
+from fin.models.index import Index, IndexTicker, Source
+from fin.models.index.parsers import ISharesTicker, VanguardTicker
+from fin.models.index.parsers.helpers import ParsedIndexTicker, TickerResolver
+from fin.models.ticker import Ticker
+from fin.models.utils import UpdatingStatus
+from fin.tasks.reload_index import reload_index
 from fin.tests.base import BaseTestCase
 from fin.tests.factories.index import IndexFactory
 from users.models import User
@@ -46,6 +48,8 @@ class IndexTests(BaseTestCase):
             "name",
             "sectors_breakdown",
             "status",
+            "reload_status",
+            "reload_timings",
             "tickers_last_updated",
             "updated",
         }
@@ -66,6 +70,8 @@ class IndexTests(BaseTestCase):
             "source",
             "name",
             "status",
+            "reload_status",
+            "reload_timings",
             "tickers_last_updated",
             "updated",
         }
@@ -99,20 +105,87 @@ class IndexTests(BaseTestCase):
         self.assertTrue(Index.objects.filter(id=index.id).exists())
         self.assertEqual(Index.objects.first().tickers.count(), 3)
 
-    def test_index_creation(self):
+    @patch("fin.tasks.reload_index.reload_index_task.delay")
+    def test_index_creation(self, reload_mock):
         """
-        Tests that after index creation runs task for updating the index tickers
+        Tests that index creation schedules the index reload instead of loading the source, the
+        reload is sent only after the index is committed
         """
         url = reverse("index-list")
         index = IndexFactory.build()
 
-        response = self.client.post(url, {"source": index.source})
-        task_args = (Index.__name__, response.data.get("id"))
-        task = update_model_tickers_statements_task.apply(args=task_args)
-        while not task.ready():
-            sleep(0.1)
+        with patch.object(Source, "parsers_mapper", {}):
+            with self.captureOnCommitCallbacks() as callbacks:
+                response = self.client.post(url, {"source": index.source.id})
+            self.assertEqual(response.status_code, HTTP_201_CREATED)
+            reload_mock.assert_not_called()
+            for callback in callbacks:
+                callback()
+        reload_mock.assert_called_once_with(response.data["id"])
 
-        self.assertEqual(task.result, LOCKED)
+        User.objects.filter(id=self.user.id).update(is_staff=True, is_superuser=True)
+        source = Source.objects.filter(updatable=True, index=None).first()
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(
+                reverse("admin:fin_index_add"),
+                {"source": source.id, "status": UpdatingStatus.successfully_updated},
+            )
+        self.assertRedirects(response, reverse("admin:fin_index_changelist"))
+        self.assertEqual(reload_mock.call_count, 1)
+        for callback in callbacks:
+            callback()
+        reload_mock.assert_called_with(Index.objects.get(source=source).id)
+
+    def test_index_reloading(self):
+        """
+        Tests that the index reload stores the status and the timings of every stage and skips
+        the stages after the download when the source did not change
+        """
+        index = IndexFactory(source=Source.objects.get(name="IBUY"))
+        parsed_index_tickers = [
+            ParsedIndexTicker(
+                raw_data={},
+                ticker=VanguardTicker(
+                    company_name="Apple",
+                    cusip="037833100",
+                    isin=None,
+                    price=Decimal(100),
+                    sedol=None,
+                    symbol="AAPL",
+                ),
+                weight=Decimal(1),
+            )
+        ]
+        parser = Mock(
+            load=Mock(return_value="raw data"),
+            parse=Mock(return_value=parsed_index_tickers),
+        )
+
+        parsers_mapper = {name: lambda *_: parser for name in Source.parsers_mapper}
+        with patch.object(Source, "parsers_mapper", parsers_mapper):
+            churn = reload_index(index)
+            self.assertEqual(churn["created"], 1)
+
+            index.refresh_from_db()
+            self.assertEqual(index.reload_status, UpdatingStatus.successfully_updated)
+            self.assertEqual(
+                list(index.reload_timings),
+                ["download", "parse", "resolve", "reconcile"],
+            )
+            self.assertEqual(index.tickers.get().symbol, "AAPL")
+
+            self.assertIsNone(reload_index(index))
+            index.refresh_from_db()
+            self.assertEqual(list(index.reload_timings), ["download"])
+            self.assertEqual(index.version, 1)
+            parser.parse.assert_called_once()
+
+            parser.load.return_value = "changed raw data"
+            parser.parse.side_effect = ValueError
+            with self.assertRaises(ValueError):
+                reload_index(index)
+            index.refresh_from_db()
+            self.assertEqual(index.reload_status, UpdatingStatus.update_failed)
 
     def test_the_right_serialization_class_used(self):
         """
@@ -127,4 +200,121 @@ class IndexTests(BaseTestCase):
         assert "industries_breakdown" in detailed_response.data.keys()
         assert "sectors_breakdown" in detailed_response.data.keys()
 
-        assert len(list_response.data["results"][0]) == 6
+        assert len(list_response.data["results"][0]) == 8
+
+    def test_tickers_resolving(self):
+        """
+        Tests that parsed tickers are matched with the existing tickers in memory and the missing
+        tickers are created once
+        """
+        existing_ticker = Ticker.objects.create(
+            symbol="AAPL", cusip="037833100", isin="US0378331005", price=100
+        )
+        same_symbol_ticker = Ticker.objects.create(symbol="MSFT", price=100)
+
+        def ishares_ticker(symbol, cusip, isin):
+            return ISharesTicker(
+                company_name=symbol,
+                cusip=cusip,
+                isin=isin,
+                price=Decimal(120),
+                sector="Information Technology",
+                sedol=None,
+                stock_exchange_id=None,
+                symbol=symbol,
+            )
+
+        parsed_tickers = [
+            ishares_ticker("AAPL", None, "US0378331005"),
+            ishares_ticker("MSFT", "594918104", "US5949181045"),
+            ishares_ticker("MSFT", "594918104", "US5949181045"),
+            VanguardTicker(
+                company_name="Apple",
+                cusip="037833100",
+                isin=None,
+                price=Decimal(130),
+                sedol=None,
+                symbol="AAPL",
+            ),
+        ]
+        resolver = TickerResolver(parsed_tickers)
+        with self.assertNumQueries(3):
+            resolver.load()
+        tickers = [
+            parsed_ticker.get_ticker(resolver) for parsed_ticker in parsed_tickers
+        ]
+
+        self.assertEqual(tickers[0], existing_ticker)
+        self.assertIs(tickers[1], tickers[2])
+        self.assertNotEqual(tickers[1].id, same_symbol_ticker.id)
+        self.assertEqual(resolver.created_tickers, [tickers[1]])
+        self.assertEqual(tickers[3], existing_ticker)
+
+        resolved_tickers = TickerResolver(parsed_tickers).resolve()
+        self.assertEqual(Ticker.objects.filter(cusip="594918104").count(), 1)
+        self.assertEqual(resolved_tickers[1].cusip, "594918104")
+        existing_ticker.refresh_from_db()
+        self.assertEqual(existing_ticker.price, Decimal(130))
+
+    def test_index_tickers_reconciliation(self):
+        """
+        Tests that only the changed index tickers are written on the index update, the previous
+        versions stay readable until they are collected
+        """
+        index = IndexFactory(source=Source.objects.filter(updatable=False).first())
+
+        def parsed_index_ticker(symbol, weight):
+            return ParsedIndexTicker(
+                raw_data={"ticker": symbol},
+                ticker=VanguardTicker(
+                    company_name=symbol,
+                    cusip=f"{symbol}CUSIP",
+                    isin=None,
+                    price=Decimal(100),
+                    sedol=None,
+                    symbol=symbol,
+                ),
+                weight=weight,
+            )
+
+        churn = index.update_from_parsed_index_tickers(
+            [
+                parsed_index_ticker("AAPL", 0.5),
+                parsed_index_ticker("MSFT", 0.3),
+                parsed_index_ticker("AMZN", 0.2),
+            ]
+        )
+        self.assertEqual(
+            churn, {"created": 3, "updated": 0, "deleted": 0, "unchanged": 0}
+        )
+        unchanged_id = IndexTicker.objects.get(ticker__symbol="AAPL").id
+
+        churn = index.update_from_parsed_index_tickers(
+            [
+                parsed_index_ticker("AAPL", 0.5),
+                parsed_index_ticker("MSFT", 0.25),
+                parsed_index_ticker("GOOG", 0.25),
+            ]
+        )
+        self.assertEqual(
+            churn, {"created": 1, "updated": 1, "deleted": 1, "unchanged": 1}
+        )
+        self.assertEqual(
+            IndexTicker.objects.get(ticker__symbol="AAPL").id, unchanged_id
+        )
+        self.assertEqual(
+            dict(index.get_index_tickers().values_list("ticker__symbol", "weight")),
+            {"AAPL": Decimal("0.5"), "MSFT": Decimal("0.25"), "GOOG": Decimal("0.25")},
+        )
+        self.assertEqual(
+            dict(index.get_index_tickers(1).values_list("ticker__symbol", "weight")),
+            {"AAPL": Decimal("0.5"), "MSFT": Decimal("0.3"), "AMZN": Decimal("0.2")},
+        )
+        self.assertEqual(index.tickers.count(), 3)
+        self.assertEqual(IndexTicker.objects.current().count(), 3)
+
+        index.collect_versions(keep=1)
+        self.assertEqual(IndexTicker.objects.filter(index=index).count(), 3)
+        self.assertEqual(
+            list(index.versions.values_list("number", flat=True)), [index.version]
+        )
@@ -5,6 +5,7 @@ import time
 from datetime import datetime
 
 from fin.external_api.alpha_vantage import AlphaVantage, AVFunctions
+from fin.external_api.alpha_vantage.limiter import RateLimiter
 from fin.tests.base import BaseTestCase
 
 
@@ -17,16 +18,17 @@ class AVTests(BaseTestCase):
         """
         Tests an awaiting of Alpha Vantage client
         """
-        time.sleep(AlphaVantage.STEP)
+        time.sleep(RateLimiter.MINUTE)
         test_symbol = "AAPL"
+        calls_per_minute = 5
 
-        av_api = AlphaVantage()
-        for _ in range(5):
-            av_api.call(AVFunctions.overview.value, test_symbol)
-
+        av_api = AlphaVantage(RateLimiter(calls_per_minute, 500))
         start_time = datetime.now()
-        av_api.call(AVFunctions.overview.value, test_symbol)
+        for _ in range(calls_per_minute + 1):
+            av_api.call(AVFunctions.overview.value, test_symbol)
         end_time = datetime.now()
 
         difference = end_time - start_time
-        self.assertGreaterEqual(difference.seconds, AlphaVantage.STEP)
+        self.assertGreaterEqual(
+            difference.total_seconds(), RateLimiter.MINUTE / calls_per_minute
+        )
@@ -0,0 +1,62 @@
+"""
+Tests for AV responses cache
+"""
+import json
+import os
+import tempfile
+from unittest.mock import patch, Mock
+
+from fin.external_api.alpha_vantage import AlphaVantage, AVFunctions
+from fin.external_api.alpha_vantage.cache import FileResponseCache
+from fin.external_api.alpha_vantage.limiter import RateLimiter
+from fin.tests.base import BaseTestCase
+
+
+class AVCacheTests(BaseTestCase):
+    """
+    Tests for caching of Alpha Vantage responses
+    """
+
+    overview = {"Symbol": "AAPL", "Country": "USA"}
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = FileResponseCache(self.directory.name)
+        self.av_api = AlphaVantage(RateLimiter(100, 100), self.cache)
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    @patch("fin.external_api.alpha_vantage.requests.get")
+    def test_responses_caching(self, get_mock):
+        """
+        Tests that the same response is requested once, bypass forces the request
+        """
+        get_mock.return_value = Mock(text=json.dumps(self.overview))
+
+        for _ in range(2):
+            response = self.av_api.call(AVFunctions.overview.value, "AAPL")
+            self.assertEqual(response, self.overview)
+        self.assertEqual(get_mock.call_count, 1)
+        self.assertEqual(self.cache.get_metrics(), {"hits": 1, "misses": 1})
+
+        self.av_api.call(AVFunctions.overview.value, "AAPL", bypass_cache=True)
+        self.assertEqual(get_mock.call_count, 2)
+
+        get_mock.return_value = Mock(text=json.dumps({"Error Message": "Invalid"}))
+        for _ in range(2):
+            self.av_api.call(AVFunctions.balance_sheet.value, "INVALID")
+        self.assertEqual(get_mock.call_count, 4)
+
+    @patch("fin.external_api.alpha_vantage.requests.get")
+    def test_responses_expiration(self, get_mock):
+        """
+        Tests that expired responses are requested again
+        """
+        get_mock.return_value = Mock(text=json.dumps(self.overview))
+        self.av_api.call(AVFunctions.overview.value, "AAPL")
+
+        path = self.cache.get_path(AVFunctions.overview.value, "AAPL")
+        os.utime(path, (0, 0))
+        self.av_api.call(AVFunctions.overview.value, "AAPL")
+        self.assertEqual(get_mock.call_count, 2)
@@ -1,8 +1,12 @@
 """
 Tests for AV parsers
 """
+from datetime import date
 
-from fin.external_api.alpha_vantage.parsers import parse_time_series_monthly
+from fin.external_api.alpha_vantage.parsers import (
+    parse_income_statement,
+    parse_time_series_monthly,
+)
 from fin.models.portfolio import Portfolio, PortfolioTicker
 from fin.models.ticker import Ticker, TickerStatement
 from fin.tests.base import BaseTestCase
@@ -87,3 +91,75 @@ class AVParsersTests(BaseTestCase):
 
         tickers_statements = ticker.ticker_statements.order_by("-fiscal_date_ending")
         assert len(tickers_statements) == expected_length
+
+    def test_statements_upsert(self):
+        """
+        Tests that statements upsert inserts new statements, updates the restated ones and skips
+        the unchanged ones
+        """
+        ticker = Ticker.objects.get(symbol="AAPL")
+        ticker_income_statement = {
+            "quarterlyReports": [
+                {
+                    "fiscalDateEnding": "2020-09-30",
+                    "netIncome": "12673000000",
+                    "totalRevenue": "64698000000",
+                },
+                {
+                    "fiscalDateEnding": "2020-06-30",
+                    "netIncome": "11253000000",
+                    "totalRevenue": "59685000000",
+                },
+            ]
+        }
+
+        counts = TickerStatement.objects.upsert(
+            parse_income_statement(ticker, ticker_income_statement)
+        )
+        self.assertEqual(counts, {"inserted": 4, "updated": 0, "unchanged": 0})
+
+        ticker_income_statement["quarterlyReports"][0]["netIncome"] = "12700000000"
+        with self.assertNumQueries(1):
+            counts = TickerStatement.objects.upsert(
+                parse_income_statement(ticker, ticker_income_statement)
+            )
+        self.assertEqual(counts, {"inserted": 0, "updated": 1, "unchanged": 3})
+        self.assertEqual(
+            ticker.ticker_statements.get(
+                name="net_income", fiscal_date_ending="2020-09-30"
+            ).value,
+            12700000000,
+        )
+        self.assertEqual(ticker.ticker_statements.count(), 4)
+
+    def test_parse_time_series_monthly_incrementally(self):
+        """
+        Tests that only the prices after the latest stored price date and the restatement
+        window are parsed
+        """
+        ticker = Ticker.objects.get(symbol="AAPL")
+        ticker_time_series = {
+            "Monthly Adjusted Time Series": {
+                price_date: {"5. adjusted close": "100.0000"}
+                for price_date in [
+                    "2020-08-31",
+                    "2020-07-31",
+                    "2020-06-30",
+                    "2020-05-29",
+                ]
+            }
+        }
+        self.assertEqual(len(parse_time_series_monthly(ticker, ticker_time_series)), 4)
+
+        ticker.price_date = date(2020, 7, 31)
+        tickers_statements = parse_time_series_monthly(
+            ticker, ticker_time_series, restatement_months=0
+        )
+        self.assertEqual(
+            [statement.fiscal_date_ending for statement in tickers_statements],
+            [date(2020, 8, 31), date(2020, 7, 31)],
+        )
+        tickers_statements = parse_time_series_monthly(
+            ticker, ticker_time_series, restatement_months=1
+        )
+        self.assertEqual(len(tickers_statements), 3)
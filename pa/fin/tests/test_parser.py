@@ -1,10 +1,17 @@
 """
 Tests for indexes parsers
 """
+import tempfile
 from decimal import Decimal
+from unittest.mock import Mock
 
 from fin.models.index import Source
-from fin.models.index.parsers import AmplifyParser
+from fin.models.index.parsers import (
+    AmplifyParser,
+    ConditionalFetcher,
+    DiskFetcher,
+    load_parsers,
+)
 from fin.tests.base import BaseTestCase
 
 
@@ -32,3 +39,67 @@ class ParsersTests(BaseTestCase):
             self.assertGreater(parsed_index_ticker.ticker.price, Decimal("0"))
             coefficient_sum += parsed_index_ticker.weight
         self.assertAlmostEqual(coefficient_sum / 100, 1, places=2)
+
+    def test_lazy_parser_loading(self):
+        """
+        Tests that the parser downloads raw data only on the parsing and the disk fetcher replays
+        the recorded responses
+        """
+        raw_data = (
+            "Account,StockTicker,SecurityName,CUSIP,Shares,MarketValue,Weightings\n"
+            'IBUY,AMZN,Amazon,023135106,10,"1,000",60.00%\n'
+            "IBUY,Cash&Other,Cash,,1,100,40.00%\n"
+        )
+        fetcher = Mock(fetch=Mock(return_value=raw_data))
+        source = Source.objects.filter(parser_name=AmplifyParser.__name__).first()
+
+        with tempfile.TemporaryDirectory() as directory:
+            parser = source.get_parser(DiskFetcher(directory, fetcher))
+            fetcher.fetch.assert_not_called()
+
+            parsed_index_tickers = parser.parse()
+            self.assertEqual(len(parsed_index_tickers), 1)
+            self.assertEqual(parsed_index_tickers[0].ticker.price, Decimal(100))
+            parser.parse()
+            fetcher.fetch.assert_called_once()
+
+            replaying_parser = source.get_parser(DiskFetcher(directory))
+            self.assertEqual(load_parsers([replaying_parser]), {})
+            self.assertEqual(replaying_parser.parse(), parsed_index_tickers)
+
+            failed_parser = source.get_parser(DiskFetcher(f"{directory}/missing"))
+            errors = load_parsers([failed_parser])
+            self.assertIsInstance(errors[failed_parser], FileNotFoundError)
+
+    def test_conditional_fetching(self):
+        """
+        Tests that the conditional fetcher sends the stored validators and returns the stored
+        body on 304 Not Modified
+        """
+        url = "https://example.com/holdings.csv"
+        responses = [
+            Mock(status_code=200, text="holdings", headers={"ETag": '"1"'}),
+            Mock(status_code=304, text="", headers={}),
+            Mock(status_code=200, text="new holdings", headers={"ETag": '"2"'}),
+        ]
+
+        with tempfile.TemporaryDirectory() as directory:
+            fetcher = ConditionalFetcher(directory)
+            fetcher.session.get = Mock(side_effect=responses)
+
+            self.assertEqual(fetcher.fetch(url), "holdings")
+            self.assertEqual(fetcher.fetch(url), "holdings")
+            self.assertEqual(
+                fetcher.session.get.call_args.kwargs["headers"],
+                {"If-None-Match": '"1"'},
+            )
+            self.assertEqual(fetcher.fetch(url), "new holdings")
+
+            replaying_fetcher = ConditionalFetcher(directory)
+            replaying_fetcher.session.get = Mock(return_value=responses[1])
+            self.assertEqual(replaying_fetcher.fetch(url), "new holdings")
+            self.assertEqual(
+                replaying_fetcher.session.get.call_args.kwargs["headers"],
+                {"If-None-Match": '"2"'},
+            )
+        self.assertEqual(fetcher.get_metrics(), {"downloaded": 2, "not_modified": 1})
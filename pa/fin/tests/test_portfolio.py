@@ -3,6 +3,8 @@ Portfolio Tests
 """
 import os
 
+import numpy as np
+import pandas as pd
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework.status import (
@@ -14,6 +16,12 @@ from rest_framework.status import (
 from fin.mixins import AdjustMixin
 from fin.models.index.index import Index
 from fin.models.portfolio import Portfolio, PortfolioTicker
+from fin.models.portfolio.rebalancing import (
+    ExactRebalancingEngine,
+    LargestRemainderRebalancingEngine,
+    RebalancingEngine,
+    weights_deviation,
+)
 from fin.models.utils import UpdatingStatus
 from fin.tests.base import BaseTestCase
 from fin.tests.factories.exante_settings import ExanteSettingsFactory
@@ -122,12 +130,111 @@ class PortfolioTests(BaseTestCase):
         adjusted_index = index.adjust(
             float(portfolio.total_tickers), step, AdjustMixin.default_adjust_options
         )
-        tickers_diff = Portfolio.tickers_difference(adjusted_index, portfolio_query)
+        with self.assertNumQueries(1):
+            tickers_diff = Portfolio.tickers_difference(adjusted_index, portfolio_query)
 
         for i in range(0, 4):
             self.assertEqual(expected_result[i][0], tickers_diff.iloc[i].id)
             self.assertEqual(expected_result[i][1], tickers_diff.iloc[i].amount)
 
+    def test_index_adjusting_fits_money(self):
+        """
+        Tests that the adjusted index costs not more than the given money
+        """
+        portfolio = Portfolio.objects.first()
+        index = Index.objects.first()
+        invested_money = float(portfolio.total_tickers)
+
+        for extra_money in (200, 5000, 1000000):
+            with self.subTest(extra_money=extra_money):
+                adjusted_index = index.adjust(
+                    invested_money,
+                    extra_money,
+                    AdjustMixin.default_adjust_options,
+                    precision=1,
+                )
+                self.assertLessEqual(
+                    adjusted_index.cost.sum(), invested_money + extra_money
+                )
+
+    def test_money_amount_finding(self):
+        """
+        Tests that the found money amount fits the money and the next money level does not fit
+        """
+        precision = 1
+        tickers_df = pd.DataFrame(
+            {"price": [1.5, 20, 310.25], "weight": [0.5, 0.3, 0.2]}
+        )
+
+        for money in (1000, 10000, 1000000):
+            with self.subTest(money=money):
+                money_amount = Index.find_money_amount(money, tickers_df, precision)
+                Index.evaluate_dataframe(money_amount, tickers_df)
+                self.assertLessEqual(tickers_df.cost.sum(), money)
+                Index.evaluate_dataframe(money_amount + precision, tickers_df)
+                self.assertGreater(tickers_df.cost.sum(), money)
+
+    def test_rebalancing_engines(self):
+        """
+        Tests that rebalancing engines fit the money and the exact engine has the least tracking
+        error
+        """
+        money = 1000
+        tickers_diff_df = pd.DataFrame(
+            {
+                "id": [1, 2, 3, 4, 5],
+                "price": [420.5, 150.25, 75.0, 33.3, 12.1],
+                "amount": [1.0, 3.0, 2.0, 5.0, 4.0],
+            }
+        )
+        prices = tickers_diff_df.price.to_numpy()
+        amounts = tickers_diff_df.amount.to_numpy()
+        target_costs = RebalancingEngine.get_target_costs(money, prices, amounts)
+
+        deviations = {}
+        for name in Portfolio.rebalancing_engines:
+            engine = Portfolio.get_rebalancing_engine(name)
+            packed_tickers = engine.pack(money, tickers_diff_df)
+            costs = np.zeros(len(tickers_diff_df))
+            for i, ticker_id in enumerate(tickers_diff_df.id):
+                if ticker_id in packed_tickers:
+                    self.assertLessEqual(
+                        packed_tickers[ticker_id]["amount"], amounts[i]
+                    )
+                    costs[i] = packed_tickers[ticker_id]["cost"]
+            self.assertLessEqual(costs.sum(), money)
+            deviations[name] = weights_deviation(money, target_costs, costs)
+
+        self.assertLessEqual(deviations["exact"], deviations["largest_remainder"])
+        self.assertLessEqual(deviations["largest_remainder"], deviations["greedy"])
+
+    def test_rebalancing_engines_fractional_amounts(self):
+        """
+        Tests that the exact and the largest remainder engines buy whole amounts not exceeding
+        the fractional desired amounts and the exact engine falls back on the large problems
+        """
+        money = 1000
+        prices = np.array([420.5, 150.25, 75.0, 33.3, 12.1])
+        amounts = np.array([1.5, 3.7, 2.2, 5.9, 4.4])
+        target_costs = RebalancingEngine.get_target_costs(money, prices, amounts)
+
+        deviations = {}
+        for name in ["exact", "largest_remainder"]:
+            engine = Portfolio.get_rebalancing_engine(name)
+            result = engine.get_amounts(money, prices, amounts)
+            np.testing.assert_array_equal(result, np.floor(result))
+            self.assertTrue((result <= np.floor(amounts)).all())
+            self.assertLessEqual((result * prices).sum(), money)
+            deviations[name] = weights_deviation(money, target_costs, result * prices)
+        self.assertLessEqual(deviations["exact"], deviations["largest_remainder"])
+
+        np.testing.assert_array_equal(
+            ExactRebalancingEngine(max_combinations=10).get_amounts(
+                money, prices, amounts
+            ),
+            LargestRemainderRebalancingEngine().get_amounts(money, prices, amounts),
+        )
+
     def test_portfolio_breakdowns_calculation(self):
         """
         Tests that the breakdowns in the Portfolio model calculate properly
@@ -0,0 +1,25 @@
+"""
+Tests for the application startup cost
+"""
+from django.test import SimpleTestCase
+
+from fin.management.commands.benchmark_startup import LAZY_MODULES, get_import_times
+
+
+class StartupTests(SimpleTestCase):
+    """
+    Tests that the application starts without the heavy numeric dependencies, the import time
+    budget is checked by the benchmark_startup command
+    """
+
+    def test_startup_imports(self):
+        """
+        Tests that django.setup() and the URLs loading import neither pandas, numpy, sklearn nor
+        selenium
+        """
+        import_times, _ = get_import_times()
+
+        imported_lazy_modules = {
+            module.split(".")[0] for module in import_times
+        } & LAZY_MODULES
+        self.assertEqual(imported_lazy_modules, set())
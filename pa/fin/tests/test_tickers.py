@@ -2,10 +2,20 @@
 Ticker Tests
 """
 from datetime import date
+from unittest.mock import patch
 
 from dateutil.relativedelta import relativedelta
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.utils import timezone
 
-from fin.models.ticker import Ticker, Statements
+from fin.models.ticker import (
+    Ticker,
+    Statements,
+    TickerFundamentals,
+    TickerStatement,
+)
+from fin.models.ticker.calculator import FundamentalsCalculator
 from fin.serializers.ticker import TickerSerializer
 from fin.tests.base import BaseTestCase
 from fin.tests.factories.ticker_statement import TickerStatementFactory
@@ -35,6 +45,35 @@ class TickersTests(BaseTestCase):
             annual_earnings_growth, expected_annual_earnings_growth, places=2
         )
 
+    def test_annual_earnings_growth_queries(self):
+        """
+        Tests that annual earnings growth fetches the net income series with one query
+        """
+        ticker = Ticker.objects.first()
+        cache.clear()
+
+        for _ in range(2):
+            with self.assertNumQueries(1):
+                annual_earnings_growth = (
+                    TickerFundamentals.calculate_annual_earnings_growth(
+                        ticker, today=date(2021, 8, 17)
+                    )
+                )
+            self.assertAlmostEqual(annual_earnings_growth, 6.4, places=2)
+
+        # the restated older value is not served from the memo
+        statement = ticker.net_income_statements(date(2016, 1, 1)).last()
+        TickerStatement.objects.filter(id=statement.id).update(
+            value=statement.value * 2, updated=timezone.now()
+        )
+        self.assertNotAlmostEqual(
+            TickerFundamentals.calculate_annual_earnings_growth(
+                ticker, today=date(2021, 8, 17)
+            ),
+            annual_earnings_growth,
+            places=2,
+        )
+
     def test_shares_dilution_calculation(self):
         """
         Tests that shares dilution calculates correctly
@@ -69,6 +108,7 @@ class TickersTests(BaseTestCase):
 
         last_year_shares_amount.delete()
 
+        serializer = TickerSerializer()
         dilution_rate = serializer.get_shares_dilution(ticker)
         self.assertEqual(dilution_rate, None)
 
@@ -104,8 +144,118 @@ class TickersTests(BaseTestCase):
         self.assertEqual(round(ratios["roa"]), expected_roa)
         self.assertEqual(round(ratios["roe"]), expected_roe)
 
+    def test_tickers_serialization_with_fundamentals(self):
+        """
+        Tests that TickerSerializer reads materialized fundamentals with a constant number of
+        queries
+        """
+        for i in range(5):
+            Ticker.objects.create(symbol=f"TEST{i}", price=1)
+        TickerFundamentals.refresh(Ticker.objects.all())
+
+        ticker = Ticker.objects.first()
+        expected_ratios = TickerSerializer().get_returns_ratios(ticker)
+        TickerStatementFactory(
+            name=Statements.net_income,
+            fiscal_date_ending=date.today(),
+            value=1,
+            ticker=ticker,
+        ).save()
+
+        tickers = Ticker.objects.select_related("fundamentals", "stock_exchange")
+        with self.assertNumQueries(1):
+            serialized_tickers = TickerSerializer(tickers, many=True).data
+
+        self.assertEqual(len(serialized_tickers), Ticker.objects.count())
+        self.assertEqual(serialized_tickers[0]["returns_ratios"], expected_ratios)
+
+        # the failed refresh keeps the previous fundamentals
+        with patch.object(
+            TickerFundamentals.objects, "bulk_create", side_effect=DatabaseError
+        ):
+            with self.assertRaises(DatabaseError):
+                TickerFundamentals.refresh(Ticker.objects.all())
+        self.assertEqual(TickerFundamentals.objects.count(), Ticker.objects.count())
+
+    def test_fundamentals_calculator(self):
+        """
+        Tests that the batch fundamentals calculation gives the expected ratios
+        """
+        ticker = Ticker.objects.first()
+        empty_ticker = Ticker.objects.create(symbol="EMPTY", price=1)
+        balance_sheet = {
+            Statements.short_term_debt: 5000000000,
+            Statements.total_assets: 323000000000,
+            Statements.total_long_term_debt: 8000000000,
+            Statements.total_shareholder_equity: 65000000000,
+        }
+        for i in range(0, 4):
+            for statement, value in balance_sheet.items():
+                TickerStatementFactory(
+                    name=statement,
+                    fiscal_date_ending=date(2020, 9, 30) - relativedelta(months=i * 3),
+                    value=value + i,
+                    ticker=ticker,
+                ).save()
+        for fiscal_date_ending, value in [
+            (date(2021, 8, 1), 4),
+            (date(2020, 8, 1), 2),
+            (date(2019, 8, 1), 1),
+        ]:
+            TickerStatementFactory(
+                name=Statements.outstanding_shares,
+                fiscal_date_ending=fiscal_date_ending,
+                value=value,
+                ticker=ticker,
+            ).save()
+
+        calculator = FundamentalsCalculator(today=date(2021, 8, 17))
+        fundamentals = calculator.calculate_for([ticker.id, empty_ticker.id])
+
+        self.assertAlmostEqual(
+            fundamentals.loc[ticker.id, "annual_earnings_growth"], 6.4, places=2
+        )
+        # the latest four quarters net income is 57.411 billions, ROA and ROE use the average
+        # total assets and equity of the same quarters
+        self.assertAlmostEqual(fundamentals.loc[ticker.id, "roa"], 17.77)
+        self.assertAlmostEqual(fundamentals.loc[ticker.id, "roe"], 88.32)
+        self.assertEqual(set(fundamentals.loc[empty_ticker.id].values), {None})
+
+        # the latest balance sheet gives (5 + 8) / 65 * 100 and 323 / 65
+        self.assertAlmostEqual(fundamentals.loc[ticker.id, "debt_to_equity"], 20.0)
+        self.assertAlmostEqual(fundamentals.loc[ticker.id, "assets_to_equity"], 4.97)
+        self.assertAlmostEqual(fundamentals.loc[ticker.id, "shares_dilution"], 100.0)
+
+        # the shares dilution is calculated for the current date by default, (3 / 2 - 1) * 100
+        for months, value in [(1, 3), (14, 2)]:
+            TickerStatementFactory(
+                name=Statements.outstanding_shares,
+                fiscal_date_ending=date.today() - relativedelta(months=months),
+                value=value,
+                ticker=empty_ticker,
+            ).save()
+        fundamentals = FundamentalsCalculator().calculate_for([empty_ticker.id])
+        self.assertAlmostEqual(
+            fundamentals.loc[empty_ticker.id, "shares_dilution"],
+            50.0,
+        )
+
     def test_outdated_tickers_manager(self):
         """
         Tests outdated tickers manager
         """
         self.assertEqual(Ticker.outdated_tickers.count(), 1)
+
+        ticker = Ticker.objects.get()
+        Ticker.objects.update(
+            sector="Technology", industry="Electronic Computers", country="USA", pe=30
+        )
+        self.assertEqual(Ticker.outdated_tickers.count(), 0)
+
+        ticker.track_statements_dates(
+            ticker.ticker_statements.filter(name=Statements.net_income)
+        )
+        ticker.save()
+        self.assertEqual(ticker.income_statement_date, date(2020, 9, 30))
+        self.assertEqual(Ticker.outdated_tickers.count(), 1)
+        self.assertNotIn("JOIN", str(Ticker.outdated_tickers.all().query))
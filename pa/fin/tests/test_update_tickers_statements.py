@@ -1,15 +1,82 @@
 """
 Tests for main functionality of update_tickers_statements_task
 """
+import threading
+from datetime import timedelta
+from decimal import Decimal
 from time import sleep
+from unittest.mock import patch
 
-from fin.models.ticker import Ticker, Statements
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from fin.external_api.alpha_vantage import AVFunctions
+from fin.external_api.alpha_vantage.fetcher import TickersFetcher
+from fin.external_api.alpha_vantage.single_flight import (
+    RefreshStates,
+    TickerRefreshFlight,
+)
+from fin.external_api.alpha_vantage.limiter import (
+    Priorities,
+    RateLimiter,
+    WaitingCancelled,
+    RedisRateLimiter,
+)
+from fin.models.ticker import Ticker, TickerStatement, Statements
+from fin.models.portfolio import Portfolio, PortfolioTicker
+from fin.models.utils import UpdatingStatus
+from fin.tasks.schedule_tickers_updates import TickersUpdateScheduler
 from fin.tasks.update_tickers_statements import (
+    TICKERS_WRITE_BATCH_SIZE,
+    finish_model_tickers_statements_task,
+    update_model_tickers_statements_task,
+    update_tickers_batch_statements_task,
+    update_tickers_batch,
     update_tickers_statements,
     update_tickers_statements_task,
     LOCKED,
 )
 from fin.tests.base import BaseTestCase
+from fin.tests.factories.portfolio import PortfolioFactory
+from pa.celery import redis_client as r
+
+
+class FakeAlphaVantage:
+    """
+    AV API client that returns the same responses for every ticker
+    """
+
+    responses = {
+        AVFunctions.overview: {
+            "Country": "USA",
+            "Industry": "Electronic Computers",
+            "Sector": "Technology",
+            "PERatio": "None",
+            "SharesOutstanding": "100",
+        },
+        AVFunctions.income_statement: {},
+        AVFunctions.balance_sheet: {},
+        AVFunctions.time_series_monthly_adjusted: {
+            "Monthly Adjusted Time Series": {
+                "2021-07-30": {"5. adjusted close": "145.8600"},
+            }
+        },
+    }
+
+    def __init__(self, limiter):
+        self.limiter = limiter
+        self.threads = set()
+
+    def call(self, function, symbol, cancelled=None):
+        """
+        Returns the response of the function
+        """
+        if symbol == "FAIL":
+            raise ValueError(symbol)
+        self.limiter.acquire(cancelled)
+        self.threads.add(threading.get_ident())
+        return self.responses[AVFunctions(function)]
 
 
 class UpdateTickersStatementsTests(BaseTestCase):
@@ -57,3 +124,343 @@ class UpdateTickersStatementsTests(BaseTestCase):
             .first()
         )
         self.assertNotEqual(ticker_price, old_ticker_price)
+
+    def test_rate_limiter(self):
+        """
+        Tests that the rate limiter allows calls within the quota and waits for the rest
+        """
+        limiter = RateLimiter(calls_per_minute=2, calls_per_day=100)
+        limiter.acquire()
+        limiter.acquire()
+
+        cancelled = threading.Event()
+        cancelled.set()
+        with self.assertRaises(WaitingCancelled):
+            limiter.acquire(cancelled)
+
+        limiter = RateLimiter(calls_per_minute=100, calls_per_day=1)
+        limiter.acquire()
+        with self.assertRaises(WaitingCancelled):
+            limiter.acquire(cancelled)
+
+    def test_rate_limiter_priorities(self):
+        """
+        Tests that background calls leave the reserve to interactive calls and wait for the
+        interactive activity to end
+        """
+        cancelled = threading.Event()
+        cancelled.set()
+
+        limiter = RateLimiter(2, 100, interactive_reserve=0.5)
+        limiter.acquire(cancelled, Priorities.background)
+        with self.assertRaises(WaitingCancelled):
+            limiter.acquire(cancelled, Priorities.background)
+        limiter.acquire(cancelled, Priorities.interactive)
+
+        limiter = RateLimiter(100, 100, interactive_window=60)
+        limiter.acquire(cancelled, Priorities.interactive)
+        with self.assertRaises(WaitingCancelled):
+            limiter.acquire(cancelled, Priorities.background)
+
+    def test_redis_rate_limiter(self):
+        """
+        Tests that the Redis rate limiter shares quotas between limiters with the same key
+        """
+        key = "test_redis_rate_limiter"
+        r.delete(f"{key}:minute", f"{key}:day", f"{key}:metrics")
+        first_limiter = RedisRateLimiter(r, key, {"minute": (2, 60), "day": (100, 60)})
+        second_limiter = RedisRateLimiter(r, key, {"minute": (2, 60), "day": (100, 60)})
+        first_limiter.acquire()
+        second_limiter.acquire()
+
+        cancelled = threading.Event()
+        cancelled.set()
+        with self.assertRaises(WaitingCancelled):
+            first_limiter.acquire(cancelled)
+
+        first_limiter.throttled()
+        self.assertEqual(
+            second_limiter.get_metrics(),
+            {
+                "throttled": 1,
+                Priorities.interactive: {"calls": 2, "waits": 0, "wait_seconds": 0.0},
+                Priorities.background: {"calls": 0, "waits": 0, "wait_seconds": 0.0},
+            },
+        )
+        r.delete(f"{key}:minute", f"{key}:day", f"{key}:metrics")
+
+    def test_ticker_refresh_single_flight(self):
+        """
+        Tests that a worker waits for the refresh of the ticker by another worker and reuses it
+        """
+        ticker = Ticker.objects.first()
+        r.delete(TickerRefreshFlight.get_lock_key(ticker.id))
+        first_flight = TickerRefreshFlight(r, "first")
+        second_flight = TickerRefreshFlight(r, "second")
+
+        self.assertTrue(first_flight.lead_or_wait(ticker.id))
+        results = []
+        waiting_thread = threading.Thread(
+            target=lambda: results.append(second_flight.lead_or_wait(ticker.id))
+        )
+        waiting_thread.start()
+        sleep(TickerRefreshFlight.poll_interval * 2)
+        first_flight.update(ticker.id, RefreshStates.writing)
+        self.assertEqual(
+            second_flight.get_status(ticker.id)["state"], RefreshStates.writing
+        )
+        first_flight.finish(ticker.id)
+        waiting_thread.join()
+
+        self.assertEqual(results, [False])
+        status = second_flight.get_status(ticker.id)
+        self.assertEqual(status["state"], RefreshStates.done)
+        self.assertEqual(status["owner"], "first")
+
+    def test_crossed_single_flights(self):
+        """
+        Tests that two runs leading the tickers the other one waits for write their pending
+        batches instead of waiting for each other until the locks expire
+        """
+        tickers = [Ticker.objects.create(symbol=f"TEST{i}", price=1) for i in range(2)]
+        for ticker in tickers:
+            r.delete(TickerRefreshFlight.get_lock_key(ticker.id))
+        limiter = RateLimiter(calls_per_minute=1000, calls_per_day=1000)
+        # both runs lead their first tickers before any of them fetches the second one
+        barrier = threading.Barrier(2, timeout=5)
+
+        class CrossingAlphaVantage(FakeAlphaVantage):
+            """
+            AV API client that waits for the other run before the first call
+            """
+
+            def call(self, function, symbol, cancelled=None):
+                if not self.threads:
+                    barrier.wait()
+                return super().call(function, symbol, cancelled)
+
+        written = {}
+
+        def write_batch(batch):
+            written[threading.get_ident()] = [ticker for ticker, _ in batch]
+            return {"inserted": 0, "updated": 0, "unchanged": 0}
+
+        runs = []
+        for name, order in [("first", tickers), ("second", tickers[::-1])]:
+            fetcher = TickersFetcher(
+                CrossingAlphaVantage(limiter),
+                workers=1,
+                flight=TickerRefreshFlight(r, name),
+            )
+            runs.append(
+                threading.Thread(
+                    target=update_tickers_statements,
+                    args=(order, fetcher),
+                    kwargs={"batch_size": 50},
+                    daemon=True,
+                )
+            )
+        # the runs write in their own threads, the writes are checked by the written batches
+        with patch(
+            "fin.tasks.update_tickers_statements.update_tickers_batch", write_batch
+        ), patch.object(Ticker, "refresh_from_db"):
+            for run in runs:
+                run.start()
+            for run in runs:
+                run.join(timeout=TickerRefreshFlight.poll_interval * 20)
+                self.assertFalse(run.is_alive())
+
+        self.assertCountEqual(written.values(), [[tickers[0]], [tickers[1]]])
+
+    def test_concurrent_fetching(self):
+        """
+        Tests that tickers are fetched concurrently and every ticker is written
+        """
+        for i in range(10):
+            Ticker.objects.create(symbol=f"TEST{i}", price=1)
+        av_api = FakeAlphaVantage(
+            RateLimiter(calls_per_minute=1000, calls_per_day=1000)
+        )
+        fetcher = TickersFetcher(av_api, workers=4, queue_size=1)
+
+        update_tickers_statements(Ticker.objects.all(), fetcher)
+
+        self.assertGreater(len(av_api.threads), 1)
+        self.assertNotIn(threading.get_ident(), av_api.threads)
+        self.assertEqual(
+            set(Ticker.objects.values_list("country", "price")),
+            {("USA", Decimal("145.86"))},
+        )
+
+        failed_ticker = Ticker.objects.create(symbol="FAIL", price=1)
+        with self.assertRaises(ValueError):
+            update_tickers_statements(Ticker.objects.order_by("-id"), fetcher)
+
+        Ticker.objects.update(price=1)
+        errors = []
+        update_tickers_statements(
+            Ticker.objects.order_by("-id"),
+            fetcher,
+            on_error=lambda ticker, error: errors.append((ticker, error)),
+        )
+        self.assertEqual([ticker for ticker, _ in errors], [failed_ticker])
+        self.assertIsInstance(errors[0][1], ValueError)
+        self.assertEqual(
+            Ticker.objects.filter(price=Decimal("145.86")).count(),
+            Ticker.objects.count() - 1,
+        )
+
+    def test_model_tickers_update_status(self):
+        """
+        Tests that the chord callback sets the object status by the tickers results of batches
+        """
+        portfolio = PortfolioFactory()
+        updated = {"ticker_id": 1, "updated": True}
+        failed = {"ticker_id": 2, "updated": False}
+
+        for batches_results, expected_status in [
+            ([[updated], [updated]], UpdatingStatus.successfully_updated),
+            ([[updated, failed]], UpdatingStatus.partially_updated),
+            ([[failed], [failed]], UpdatingStatus.update_failed),
+            ([], UpdatingStatus.successfully_updated),
+        ]:
+            task = finish_model_tickers_statements_task.apply(
+                args=(batches_results, Portfolio.__name__, portfolio.id)
+            )
+            portfolio.refresh_from_db()
+            self.assertEqual(portfolio.status, expected_status)
+            failed_count = sum(results.count(failed) for results in batches_results)
+            self.assertEqual(
+                task.result["failed"], [failed["ticker_id"]] * failed_count
+            )
+
+    def test_model_tickers_update_batches(self):
+        """
+        Tests that tickers of the object are updated by batches sent to the queue of the
+        priority
+        """
+        portfolio = PortfolioFactory()
+        for i in range(TICKERS_WRITE_BATCH_SIZE + 1):
+            PortfolioTicker.objects.create(
+                portfolio=portfolio,
+                ticker=Ticker.objects.create(symbol=f"TEST{i}", price=1),
+                amount=1,
+            )
+
+        with patch.object(r, "lock"), patch(
+            "fin.tasks.update_tickers_statements.chord"
+        ) as chord_mock:
+            update_model_tickers_statements_task.apply(
+                args=(Portfolio.__name__, portfolio.id, Priorities.background)
+            )
+
+        subtasks = list(chord_mock.call_args.args[0])
+        self.assertEqual(
+            [len(subtask.args[0]) for subtask in subtasks],
+            [TICKERS_WRITE_BATCH_SIZE, 1],
+        )
+        for subtask in subtasks:
+            self.assertEqual(subtask.args[1], Priorities.background)
+            self.assertEqual(subtask.options["queue"], Priorities.background)
+
+    def test_tickers_batch_update_retries(self):
+        """
+        Tests that only the failed tickers of the batch are retried and reported
+        """
+        failed_ticker = Ticker.objects.create(symbol="FAIL", price=1)
+        ticker_ids = [Ticker.objects.first().id, failed_ticker.id]
+        updated_ticker_ids = []
+
+        def update(tickers_query, priority, on_error):
+            for ticker in tickers_query:
+                updated_ticker_ids.append(ticker.id)
+                if ticker.symbol == "FAIL":
+                    on_error(ticker, ValueError(ticker.symbol))
+
+        with patch(
+            "fin.tasks.update_tickers_statements.update_tickers_statements",
+            side_effect=update,
+        ):
+            task = update_tickers_batch_statements_task.apply(args=(ticker_ids,))
+
+        self.assertEqual(
+            updated_ticker_ids,
+            ticker_ids
+            + [failed_ticker.id] * update_tickers_batch_statements_task.max_retries,
+        )
+        self.assertEqual(
+            [(result["ticker_id"], result["updated"]) for result in task.result],
+            [(ticker_ids[0], True), (failed_ticker.id, False)],
+        )
+
+    def test_tickers_update_scheduler(self):
+        """
+        Tests that held tickers are picked first and recently updated tickers are skipped
+        """
+        now = timezone.now()
+        held_ticker, stale_ticker, fresh_ticker = [
+            Ticker.objects.create(symbol=symbol, price=10) for symbol in ["A", "B", "C"]
+        ]
+        Ticker.objects.update(updated=now - timedelta(days=10))
+        Ticker.objects.filter(id=stale_ticker.id).update(
+            updated=now - timedelta(days=40)
+        )
+        Ticker.objects.filter(id=fresh_ticker.id).update(
+            updated=now - timedelta(hours=1)
+        )
+        PortfolioTicker.objects.create(
+            portfolio=PortfolioFactory.create(), ticker=held_ticker, amount=10
+        )
+
+        scheduler = TickersUpdateScheduler(now)
+        scores = scheduler.get_scores()
+        self.assertGreater(scores[held_ticker.id], scores[stale_ticker.id])
+        self.assertEqual(scheduler.pick(2), [held_ticker.id, stale_ticker.id])
+        self.assertNotIn(fresh_ticker.id, scheduler.pick(10))
+
+        # the failed refresh attempt is not retried within the interval
+        Ticker.objects.filter(id=held_ticker.id).update(
+            refresh_attempted=now - timedelta(hours=1)
+        )
+        self.assertEqual(scheduler.pick(1), [stale_ticker.id])
+
+        stale_tickers = Ticker.objects.filter(id=stale_ticker.id)
+        stale_tickers.update(
+            sector="Technology",
+            industry="Software",
+            country="USA",
+            pe=10,
+            overview_updated=now,
+        )
+        with CaptureQueriesContext(connection) as queries:
+            score = scheduler.get_scores()[stale_ticker.id]
+        self.assertFalse(
+            any(TickerStatement._meta.db_table in query["sql"] for query in queries)
+        )
+        # the next quarterly report is expected after the last update
+        stale_tickers.update(income_statement_date=(now - timedelta(days=150)).date())
+        self.assertAlmostEqual(scheduler.get_scores()[stale_ticker.id], score + 1)
+        stale_tickers.update(overview_updated=None)
+        self.assertAlmostEqual(scheduler.get_scores()[stale_ticker.id], score + 2)
+
+    def test_update_tickers_batch(self):
+        """
+        Tests that the batch of tickers is written with the same number of queries as one ticker
+        and the latest price is taken from the parsed prices
+        """
+        tickers = [Ticker.objects.create(symbol=f"BATCH{i}", price=1) for i in range(5)]
+        responses = FakeAlphaVantage.responses
+
+        with CaptureQueriesContext(connection) as single_ticker_queries:
+            update_tickers_batch([(tickers[0], responses)])
+        with CaptureQueriesContext(connection) as batch_queries:
+            counts = update_tickers_batch(
+                [(ticker, responses) for ticker in tickers[1:]]
+            )
+        self.assertEqual(len(batch_queries), len(single_ticker_queries))
+        self.assertEqual(counts, {"inserted": 8, "updated": 0, "unchanged": 0})
+
+        for ticker in Ticker.objects.filter(symbol__startswith="BATCH"):
+            self.assertEqual(ticker.price, Decimal("145.86"))
+            self.assertEqual(ticker.sector, "Technology")
+            self.assertEqual(str(ticker.price_date), "2021-07-30")
@@ -3,6 +3,7 @@ Views
 """
 import logging
 
+from django.db import transaction
 from rest_framework import filters, viewsets
 from rest_framework import mixins
 from rest_framework.decorators import action
@@ -24,7 +25,7 @@ from .serializers.index import IndexSerializer, DetailIndexSerializer
 from .serializers.portfolio.exante_settings import ExanteSettingsSerializer
 from .serializers.portfolio.portfolio_policy import PortfolioPolicySerializer
 from .serializers.source import SourceSerializer
-from .tasks.update_tickers_statements import update_model_tickers_statements_task
+from .tasks.reload_index import reload_index_task
 
 logger = logging.getLogger(__name__)
 
@@ -58,7 +59,8 @@ class IndexViewSet(UpdateTickersMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows indices to be viewed or edited
 
-    Send PUT request with the same data_source_url for reloading index data
+    Send PUT request with the same data_source_url for reloading index data, the index is
+    reloaded in the background, its reload status and stages timings are returned with the index
     """
 
     queryset = Index.objects.all().order_by("updated")
@@ -71,12 +73,15 @@ class IndexViewSet(UpdateTickersMixin, viewsets.ModelViewSet):
             return DetailIndexSerializer
         return IndexSerializer
 
-    def create(self, request, *args, **kwargs):
-        response = super().create(request, *args, **kwargs)
-        update_model_tickers_statements_task.delay(
-            self.model.__name__, response.data.get("id")
-        )
-        return response
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        index_id = serializer.instance.id
+        transaction.on_commit(lambda: reload_index_task.delay(index_id))
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        index_id = serializer.instance.id
+        transaction.on_commit(lambda: reload_index_task.delay(index_id))
 
 
 class PortfolioViewSet(AdjustMixin, UpdateTickersMixin, viewsets.ModelViewSet):
@@ -112,6 +117,11 @@ class PortfolioViewSet(AdjustMixin, UpdateTickersMixin, viewsets.ModelViewSet):
         """
         if self.money is None:
             raise BadRequest(detail="Money parameter is invalid")
+        if (
+            self.adjust_options["rebalancing_engine"]
+            not in Portfolio.rebalancing_engines
+        ):
+            raise BadRequest(detail="Rebalancing engine parameter is invalid")
         index_id = kwargs.get("index_id")
         portfolio_id = kwargs.get("pk")
 
@@ -166,6 +166,36 @@ REST_FRAMEWORK = {
     "DEFAULT_METADATA_CLASS": "metadata.metadata.Metadata",
 }
 
+# alpha vantage, the empty settings take the default values
+
+# "redis" shares the quotas with all workers, "local" limits calls of one process only
+ALPHAVANTAGE_RATE_LIMITER = os.environ.get("ALPHAVANTAGE_RATE_LIMITER") or "redis"
+ALPHAVANTAGE_CALLS_PER_MINUTE = int(
+    os.environ.get("ALPHAVANTAGE_CALLS_PER_MINUTE") or 5
+)
+ALPHAVANTAGE_CALLS_PER_DAY = int(os.environ.get("ALPHAVANTAGE_CALLS_PER_DAY") or 500)
+# share of every quota that background updates leave to interactive ones
+ALPHAVANTAGE_INTERACTIVE_RESERVE = float(
+    os.environ.get("ALPHAVANTAGE_INTERACTIVE_RESERVE") or 0.2
+)
+# seconds background updates wait after the last interactive call
+ALPHAVANTAGE_INTERACTIVE_WINDOW = int(
+    os.environ.get("ALPHAVANTAGE_INTERACTIVE_WINDOW") or 60
+)
+# "redis", "file" or "none"
+ALPHAVANTAGE_CACHE = os.environ.get("ALPHAVANTAGE_CACHE") or "redis"
+ALPHAVANTAGE_CACHE_DIR = os.environ.get("ALPHAVANTAGE_CACHE_DIR") or os.path.join(
+    BASE_DIR, "alpha_vantage_cache"
+)
+# months before the latest stored price that are parsed again to pick up restated prices
+ALPHAVANTAGE_PRICE_RESTATEMENT_MONTHS = int(
+    os.environ.get("ALPHAVANTAGE_PRICE_RESTATEMENT_MONTHS") or 1
+)
+ALPHAVANTAGE_FETCH_WORKERS = int(os.environ.get("ALPHAVANTAGE_FETCH_WORKERS") or 4)
+ALPHAVANTAGE_FETCH_QUEUE_SIZE = int(
+    os.environ.get("ALPHAVANTAGE_FETCH_QUEUE_SIZE") or 8
+)
+
 # celery
 
 CELERY_BROKER_URL = "redis://redis:6379"
@@ -173,12 +203,55 @@ CELERY_RESULT_BACKEND = "redis://redis:6379"
 CELERY_ACCEPT_CONTENT = ["application/json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
+# user triggered updates and bulk updates are consumed by separate workers
+CELERY_TASK_DEFAULT_QUEUE = "interactive"
+CELERY_TASK_ROUTES = {
+    "fin.tasks.update_tickers_statements.update_tickers_statements_task": {
+        "queue": "background"
+    },
+    "fin.tasks.update_tickers_fundamentals.update_tickers_fundamentals_task": {
+        "queue": "background"
+    },
+    "fin.tasks.schedule_tickers_updates.schedule_tickers_updates_task": {
+        "queue": "background"
+    },
+}
+
+# number of the last index versions kept for the history
+INDEX_VERSIONS_KEEP = int(os.environ.get("INDEX_VERSIONS_KEEP") or 30)
+# the last downloaded index sources with their ETag and Last-Modified validators
+INDEX_SOURCES_CACHE_DIR = os.environ.get("INDEX_SOURCES_CACHE_DIR") or os.path.join(
+    BASE_DIR, "index_sources_cache"
+)
+
+# tickers updates scheduling
+
+TICKERS_UPDATE_SCHEDULE_MINUTES = int(
+    os.environ.get("TICKERS_UPDATE_SCHEDULE_MINUTES") or 15
+)
+# tickers are considered fully stale after this number of days
+TICKERS_FRESHNESS_DAYS = int(os.environ.get("TICKERS_FRESHNESS_DAYS") or 30)
+TICKERS_MIN_UPDATE_INTERVAL_HOURS = int(
+    os.environ.get("TICKERS_MIN_UPDATE_INTERVAL_HOURS") or 24
+)
+
+# portfolio rebalancing
+
+# the exact rebalancing engine falls back to the largest remainder one above this number of
+# amounts combinations, so one request never searches for long
+REBALANCING_EXACT_MAX_COMBINATIONS = int(
+    os.environ.get("REBALANCING_EXACT_MAX_COMBINATIONS") or 10**4
+)
 
 # celery-beat
 
 CELERY_BEAT_SCHEDULE = {
-    "update_tickers_statements": {
-        "task": "fin.tasks.update_tickers_statements.update_tickers_statements_task",
-        "schedule": crontab(0, 0, month_of_year="*/1"),  # every month
+    "schedule_tickers_updates": {
+        "task": "fin.tasks.schedule_tickers_updates.schedule_tickers_updates_task",
+        "schedule": crontab(minute=f"*/{TICKERS_UPDATE_SCHEDULE_MINUTES}"),
+    },
+    "update_tickers_fundamentals": {
+        "task": "fin.tasks.update_tickers_fundamentals.update_tickers_fundamentals_task",
+        "schedule": crontab(0, 3),  # every night
     },
 }